@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Band-limited storage of the kernel rings and of the history of S(V).
+
+The spectra of the outer rings of a kernel that decays with the distance are
+small, their high wavenumbers even more so. BandEngine keeps each ring, and
+the spectra of S(V) it reads, only on the window of low wavenumbers
+|kx|,|ky| <= m that the ring needs. The rings sharing a window form a level:
+
+    level   rings       window        Kb[level], Ub[level]
+    0       0..a1-1     all (n x n)   (a1, n, n)
+    1       a1..a2-1    m1            (a2-a1, 2*m1+1, 2*m1+1)
+    2       a2..a3-1    m2 < m1       (a3-a2, 2*m2+1, 2*m2+1)
+    ...
+
+Each level has its own circular buffer. A new spectrum of S(V) enters level
+0; when it gets older than the last ring of a level, its crop to the next
+window moves down to the next level. The windows are powers of two and never
+grow with the distance, so a spectrum only loses wavenumbers on its way down.
+
+Error control: the window of a ring is the smallest one that leaves out at
+most tolerance*|K^|/nrings of the L2 norm of its spectrum, |K^| being the L2
+norm of the spectrum of K. The parts left out then sum at most to a fraction
+tolerance of |K^|, bandError is the actual sum. The rings are transformed
+once: the windows of the first K are only known once all its rings are,
+so their spectra are kept until then, as much memory as the Ki of Engine
+for the time of the setup.
+
+The windows only pay off for kernels with smooth spectra. The kernel
+-4·exp(-|x|/3)/(18π) of values.py has a cusp at 0, and the spectra of its
+rings fill the whole grid: at the default bandTolerance no ring gets a
+window and BandEngine stores as much as Engine. Measured with c = 5 mm/s
+(91 rings), n = 128, 200 steps, against the Ki and U of Engine:
+
+    kernel                  bandTolerance   storage   error of V   step
+    values.py               1e-4            1.00      0            1.00
+    values.py               1e-2            0.99      5.7e-8       1.00
+    values.py               1e-1            0.85      3.4e-5       0.88
+    values.py               3e-1            0.75      4.0e-5       0.80
+    -4·exp(-|x|²/9)/(9π)    1e-4            0.52      1.3e-8       0.59
+    -4·exp(-|x|²/9)/(9π)    1e-3            0.47      2.7e-7       0.61
+
+(error relative to the largest |V| of Engine, step time relative to
+Engine).
+
+    from sim import Params
+    from sim.band import BandEngine
+    field = BandEngine(Params.fromModule(values), bandTolerance=1e-4)
+'''
+
+import numpy as np
+
+from sim.engine import Engine
+from sim import ringsum
+
+
+def crop(size, m, half=False):
+    """Return the indices of the wavenumbers -m..m of an axis of a spectrum
+    in the natural FFT order.
+
+    :param size: length of the axis
+    :type  size: int
+    :param m: largest wavenumber kept
+    :type  m: int
+    :param half: whether the axis is the last one of a real FFT, which only
+                 holds the wavenumbers 0..size-1
+    :type  half: boolean
+    :rtype: numpy array of ints
+
+    """
+
+    if half:
+        return np.arange(m+1)
+    return np.r_[0:m+1, size-m:size]
+
+
+class BandEngine(Engine):
+    """Engine keeping each kernel ring and its history on a window of low
+    wavenumbers."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the windows itself
+
+    def __init__(self, p, bandTolerance=1e-4, **options):
+        """Set up the field, the windows of the rings and the cascade of
+        histories.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param bandTolerance: fraction of the L2 norm of the spectrum of K
+                              that the windows may leave out, 0 for full
+                              spectra
+        :type  bandTolerance: float
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.bandTolerance = float(bandTolerance)
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        """Initialize the windowed kernel rings Kb of each level, from one
+        pass over the spectra of the rings. The windows are chosen for the
+        first K, whose ring spectra are kept until then, and kept by
+        updateK, whose rings go to their windows at once."""
+
+        # largest |kx|,|ky| of each wavenumber and its weight in the L2 norm
+        n = self.n
+        k = np.minimum(np.arange(n), n-np.arange(n))
+        if self.realFFT:
+            kinf = np.maximum(k[:,None], np.arange(n//2+1)[None,:])
+            weight = np.ones(kinf.shape)
+            weight[:,1:(n+1)//2] = 2.0 # the conjugate half
+        else:
+            kinf = np.maximum(k[:,None], k[None,:])
+            weight = np.ones(kinf.shape)
+
+        # energy of each ring up to each window, and of the whole kernel
+        known = hasattr(self, 'windows')
+        if known:
+            self.levels()
+        kept = [] # spectra of the rings of the first K, until the windows are chosen
+        inside = np.empty((self.nrings, n//2+1))
+        total = np.zeros(kinf.shape)
+        for start, stop, spectra in self.ringSpectra():
+            for i in xrange(stop-start):
+                inside[start+i] = np.cumsum(np.bincount(kinf.ravel(), weights=(weight*spectra[i]**2).ravel(), minlength=n//2+1))
+            total += spectra.sum(axis=0)
+            if known:
+                self.fill(start, stop, spectra)
+            else:
+                kept.append((start, stop, spectra.astype(self.ftype)))
+        norm = np.sqrt((weight*total**2).sum())
+        outside = np.sqrt(np.maximum(inside[:,-1:]-inside, 0.0)) # norm left out by each window
+
+        # windows are chosen for the first K and kept by updateK
+        if not known:
+            self.windows = self.chooseWindows(outside, self.bandTolerance*norm/self.nrings)
+            self.levels()
+            while kept:
+                self.fill(*kept.pop(0))
+        rings = np.arange(self.nrings)
+        self.bandError = outside[rings, self.windows].sum()/norm if norm else 0.0
+        self.droppedMass = self.dropped()
+
+
+    def levels(self):
+        """Group the rings sharing a window into levels and allocate their
+        windowed rings Kb."""
+
+        # levels: (first ring, ring after the last one, window or None for all)
+        n = self.n
+        self.bands = []
+        for j, m in enumerate(self.windows):
+            m = None if m >= n//2 else int(m)
+            if self.bands and self.bands[-1][2] == m:
+                self.bands[-1] = (self.bands[-1][0], j+1, m)
+            else:
+                self.bands.append((j, j+1, m))
+
+        # indices of each window in the full spectra (place) and in the
+        # window of the level before (into)
+        self.place = []
+        self.into  = []
+        previous = None
+        for first, last, m in self.bands:
+            if m is None:
+                self.place.append(None)
+                self.into.append(None)
+            else:
+                self.place.append(np.ix_(crop(n, m), crop(n, m, self.realFFT)))
+                size = n if previous is None else 2*previous+1
+                self.into.append(np.ix_(crop(size, m), crop(size, m, self.realFFT)))
+            previous = m
+        self.Kb = [np.zeros((last-first,)+self.bandShape(m), dtype=self.ftype) for first, last, m in self.bands]
+
+
+    def fill(self, start, stop, spectra):
+        """Copy the spectra of the rings start..stop-1 to the windows of
+        their levels in Kb.
+
+        :param start: first ring
+        :type  start: int
+        :param stop: ring after the last one
+        :type  stop: int
+        :param spectra: the spectra of the rings, as given by ringSpectra()
+        :type  spectra: numpy array
+
+        """
+
+        firsts = [first for first, last, m in self.bands]
+        for i in xrange(stop-start):
+            j = start+i
+            level = np.searchsorted(firsts, j, side='right')-1
+            first, last, m = self.bands[level]
+            if m is None:
+                self.Kb[level][j-first] = spectra[i]
+            else:
+                self.Kb[level][j-first] = spectra[i][self.place[level]]
+
+
+    def chooseWindows(self, outside, budget):
+        """Return the window of each ring: the smallest power of two that
+        leaves out at most budget of the norm of the spectrum of the ring,
+        made to never grow with the distance.
+
+        :param outside: norm left out by each window, one row per ring
+        :type  outside: numpy array of shape (nrings, n//2+1)
+        :param budget: norm that a ring may leave out
+        :type  budget: float
+        :returns: largest wavenumber kept by each ring, n//2 for all
+        :rtype: numpy array of ints
+
+        """
+
+        windows = np.empty(self.nrings, dtype=int)
+        for j in xrange(self.nrings):
+            m = self.n//2
+            while m > 1 and outside[j, m//2] <= budget:
+                m //= 2
+            windows[j] = m
+        return np.maximum.accumulate(windows[::-1])[::-1]
+
+
+    def bandShape(self, m):
+        '''Return the shape of the spectra of a window, None for all.'''
+
+        if m is None:
+            return self.spectrumShape()
+        if self.realFFT:
+            return (2*m+1, m+1)
+        return (2*m+1, 2*m+1)
+
+
+    def history(self, U0):
+        """Initialize the circular buffers Ub of each level to the
+        spectrum U0 of S(V0), cropped to the windows.
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        self.Ub    = []
+        self.heads = [] # slot of the newest spectrum of each level
+        for level, (first, last, m) in enumerate(self.bands):
+            U = np.empty((last-first,)+self.bandShape(m), dtype=self.ctype)
+            U[:] = U0 if m is None else U0[self.place[level]]
+            self.Ub.append(U)
+            self.heads.append(0)
+
+
+    def storage(self):
+        '''Return the bytes taken by the kernel rings and the history.'''
+        return sum(K.nbytes for K in self.Kb) + sum(U.nbytes for U in self.Ub)
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        L = None
+        for level, (first, last, m) in enumerate(self.bands):
+            part = ringsum.ringMajor(self.Kb[level], self.Ub[level], self.heads[level])
+            if m is None:
+                L = part
+            else:
+                if L is None:
+                    L = np.zeros(self.spectrumShape(), dtype=part.dtype)
+                L[self.place[level]] += part
+        return self.synapticfactor*self.space(L)
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the first level and
+        move the spectra leaving each level down to the next one.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        carry = self.spectrum(S)
+        for level in xrange(len(self.bands)):
+            U = self.Ub[level]
+            slot = (self.heads[level]-1) % len(U) # the oldest slot becomes the newest
+            if level+1 < len(self.bands):
+                evicted = U[slot].copy() # moves down before it is overwritten
+            if self.into[level] is None:
+                U[slot] = carry
+            else:
+                U[slot] = carry[self.into[level]]
+            self.heads[level] = slot
+            if level+1 < len(self.bands):
+                carry = evicted
@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Compare the fields of two engines simulating the same parameters.
+
+    from sim import Params, Engine, compare
+    p = Params.fromModule(values)
+    print compare.compare(Engine(p), Engine(p, precision='single'), 1000)
+
+Precision
+---------
+
+Single precision keeps Ki and U in float32/complex64. The 'fftw' backend
+runs the FFTs in single precision; numpy.fft only transforms in double
+precision, whose result is rounded. Measured against 'double' of the same
+backend with the kernel, input and firing rate of values.py, n = 128,
+c = 50 mm/s (91 rings), no noise, 1000 steps of 1 ms, with Python 2.7,
+numpy 1.16 and pyfftw 0.12:
+
+    precision   relative error of V      seconds per step
+                numpy      fftw          numpy      fftw
+    'double'    0          0             0.0130     0.0125
+    'mixed'     1.1e-6     0.8e-6        0.0098     0.0094
+    'single'    3.7e-6     2.9e-6        0.0103     0.0090
+
+The error is the largest |V - Vdouble| over the run relative to the largest
+|Vdouble|. It stays at a few float32 resolutions and does not grow over the
+run, because the field relaxes with the time constant gamma. Ki and U take
+half the memory of 'double'. The steep firing rate of values.py
+(alpha = 10000) amplifies differences close to the threshold theta, so
+'mixed' keeps V in float64 to accumulate the small increments of dt.
+
+Threads
+-------
+
+speedup() times the steps of Engine(p, workers=...), whose results are bit
+for bit the ones of one thread (see sim.parallel). The speedup for each
+number of threads has not been measured: that needs a machine with several
+cores, and these engines were only run on a machine with one core, where
+threads can only add their overhead. On a node, measure it with
+
+    print compare.speedup(p, workers=(1, 2, 4, 8, 16, 32))
+
+Allocations
+-----------
+
+allocations() counts the arrays that the steps of an engine allocate,
+through the event hook of the numpy allocator. With Engine(p, inplace=True)
+the ring sum, the update of V and U and the firing rate of values.py work
+in the arrays of engine.workspace(), with the same results bit for bit, and
+with the 'fftw' backend the FFTs work in the arrays of their plans: a step
+then allocates no array. numpy.fft has no argument out and allocates the
+results of the FFTs, and numpy.random allocates the n x n draws of the
+noise at each step. Arrays allocated per step, with the kernel, input and
+firing rate of values.py, c = 5 mm/s (91 rings), n = 128, Python 2.7,
+numpy 1.16 and pyfftw 0.12, without noise:
+
+    options              numpy              fftw
+                         default  inplace   default  inplace
+                         110      9         102      0
+    layout='pixel'       22       9         14       0
+    realFFT=True         113      12        102      0
+    precision='single'   111      9         102      0
+    precision='mixed'    112      9         103      0
+    pipeline=True        113      9         98       0
+
+Noise adds its draws, one array, to the steps in place (four arrays to
+the others). The time of a step hardly changes (0.0886 and 0.0875 s at
+n = 256 with numpy.fft).
+'''
+
+import ctypes
+import time
+
+import numpy as np
+from numpy.core import multiarray
+
+# event hook of the numpy allocator: hook(old pointer, new pointer, size, data)
+EventHook = ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p)
+
+
+def compare(reference, candidate, steps):
+    """Advance two engines side by side and return the error of the
+    candidate against the reference.
+
+    :param reference: the engine taken as exact, such as Engine(p)
+    :type  reference: sim.engine.Engine
+    :param candidate: the engine to check, such as Engine(p, precision='single')
+    :type  candidate: sim.engine.Engine
+    :param steps: number of iterations
+    :type  steps: int
+    :returns: 'maxError': largest |V - Vref| over the run,
+              'relativeError': maxError over the largest |Vref|,
+              'finalError': |V - Vref| at the end of the run,
+              'referenceTime' and 'candidateTime': seconds per step
+    :rtype: dictionary
+
+    """
+
+    maxError = finalError = scale = 0.0
+    referenceTime = candidateTime = 0.0
+    for i in xrange(steps):
+        st = time.time()
+        reference.step()
+        referenceTime += time.time() - st
+        st = time.time()
+        candidate.step()
+        candidateTime += time.time() - st
+
+        Vref = reference.V
+        finalError = float(np.abs(candidate.V - Vref).max())
+        maxError = max(maxError, finalError)
+        scale = max(scale, float(np.abs(Vref).max()))
+
+    return {'maxError'      : maxError,
+            'relativeError' : maxError / scale if scale else maxError,
+            'finalError'    : finalError,
+            'referenceTime' : referenceTime / max(steps, 1),
+            'candidateTime' : candidateTime / max(steps, 1)}
+
+
+def compareDrive(reference, candidate, steps):
+    """Advance two engines side by side and return the error of the
+    synaptic drive L of the candidate against the one of the reference,
+    such as the wave equation of sim.wave against the delay rings.
+
+    Both engines are fed the field of the reference, so that the error is
+    the one of the drive alone and does not grow with the difference of
+    the fields; compare() gives the error of the fields of two free runs.
+
+    :param reference: the engine taken as exact, such as Engine(p)
+    :type  reference: sim.engine.Engine
+    :param candidate: the engine to check, such as WaveEngine(p)
+    :type  candidate: sim.engine.Engine
+    :param steps: number of iterations
+    :type  steps: int
+    :returns: 'maxError': largest |L - Lref| over the run,
+              'relativeError': maxError over the largest |Lref|,
+              'finalError': |L - Lref| at the end of the run
+    :rtype: dictionary
+
+    """
+
+    maxError = finalError = scale = 0.0
+    for i in xrange(steps):
+        Lref = reference.ringSum()
+        finalError = float(np.abs(candidate.ringSum() - Lref).max())
+        maxError = max(maxError, finalError)
+        scale = max(scale, float(np.abs(Lref).max()))
+
+        reference.step()
+        candidate.epoc = reference.epoc
+        candidate.record(reference.updateS(reference.Vexcite))
+
+    return {'maxError'      : maxError,
+            'relativeError' : maxError / scale if scale else maxError,
+            'finalError'    : finalError}
+
+
+def speedup(p, workers=(1, 2, 4, 8), steps=100, **options):
+    """Return the seconds per step of Engine for several numbers of
+    workers, and their speedup over the first one.
+
+    :param p: simulation parameters, or a module laid out as values.py
+    :type  p: sim.params.Params or module
+    :param workers: numbers of threads to time
+    :type  workers: sequence of ints
+    :param steps: number of iterations timed for each number of threads,
+                  after one step to start the threads
+    :type  steps: int
+    :param options: other options of Engine, such as realFFT or layout
+    :type  options: dictionary
+    :returns: number of threads: {'stepTime': seconds per step,
+              'speedup': stepTime of workers[0] over this stepTime}
+    :rtype: dictionary
+
+    """
+
+    from sim.engine import Engine
+    times = {}
+    for count in workers:
+        field = Engine(p, workers=count, **options)
+        field.step()
+        st = time.time()
+        for i in xrange(steps):
+            field.step()
+        times[count] = (time.time() - st) / max(steps, 1)
+    return dict((count, {'stepTime': times[count],
+                         'speedup' : times[workers[0]]/times[count]}) for count in workers)
+
+
+def setEventHook(hook, data=None):
+    """Install an event hook of the numpy allocator, called at each
+    allocation, reallocation and release of the data of an array, through
+    PyDataMem_SetEventHook of the C API of numpy (slot 291 of the table of
+    numpy.core.multiarray._ARRAY_API, numpy < 1.23).
+
+    :param hook: the hook, None for none
+    :type  hook: EventHook or int (address of a hook)
+    :param data: last argument of the hook
+    :type  data: int
+    :returns: the previous hook and its data, to be installed back
+    :rtype: tuple of (int, int)
+
+    """
+
+    api = multiarray._ARRAY_API
+    if type(api).__name__ == 'PyCObject': # Python 2
+        pointer = ctypes.pythonapi.PyCObject_AsVoidPtr
+        pointer.argtypes = [ctypes.py_object]
+    else:
+        pointer = ctypes.pythonapi.PyCapsule_GetPointer
+        pointer.argtypes = [ctypes.py_object, ctypes.c_char_p]
+    pointer.restype = ctypes.c_void_p
+    table = ctypes.cast(pointer(api, *([None] if pointer.argtypes[1:] else [])), ctypes.POINTER(ctypes.c_void_p))
+    install = ctypes.CFUNCTYPE(ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p, ctypes.POINTER(ctypes.c_void_p))(table[291])
+    if isinstance(hook, EventHook):
+        hook = ctypes.cast(hook, ctypes.c_void_p).value
+    previous = ctypes.c_void_p()
+    return install(hook, data, ctypes.byref(previous)), previous.value
+
+
+def allocations(engine, steps=10):
+    """Return the arrays allocated by the steps of an engine, counted by an
+    event hook of the numpy allocator (see setEventHook()). The first step
+    is not counted, as it may start threads or make plans.
+
+    :param engine: the simulation, advanced by steps+1 iterations
+    :type  engine: sim.engine.Engine
+    :param steps: number of iterations counted
+    :type  steps: int
+    :returns: {'arrays': arrays allocated by a step,
+              'bytes': bytes allocated by a step,
+              'fields': bytes over the bytes of V,
+              'largest': bytes of the largest array allocated}
+    :rtype: dictionary
+
+    """
+
+    sizes = []
+    def allocated(old, new, size, data):
+        if new: # allocation or reallocation, not a release
+            sizes.append(size)
+    hook = EventHook(allocated)
+    engine.step()
+    previous = setEventHook(hook)
+    try:
+        for i in xrange(steps):
+            engine.step()
+    finally:
+        setEventHook(*previous)
+    steps = float(max(steps, 1))
+    return {'arrays' : len(sizes)/steps,
+            'bytes'  : sum(sizes)/steps,
+            'fields' : sum(sizes)/steps/engine.Vexcite.nbytes,
+            'largest': max(sizes) if sizes else 0}
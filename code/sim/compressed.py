@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+History of S(V) compressed for the older slots.
+
+Past its first rings, a spectrum of S(V) is only read once per step until it
+leaves the history. CompressedEngine keeps the spectra of the first rings
+exact and quantizes the older ones, with one scale per slot:
+
+    'int16'     real and imaginary parts rounded to 16 bits integers of the
+                largest part of the slot
+    'float16'   real and imaginary parts in half precision, divided by the
+                largest part of the slot
+
+Both take 4 bytes per wavenumber instead of 16 (complex128) or 8
+(complex64), so the history holds 4 or 2 times more rings in the same
+memory. A spectrum is compressed when it gets the age of the first
+compressed ring, and decompressed one slot at a time by the ring sum.
+
+The error of a compressed slot is at most eps times its largest part, eps
+being 1/65534 for 'int16' and 2**-11 for 'float16'. The number of exact
+rings is the smallest one that keeps the estimate
+
+    eps · (mass of |K| in the compressed rings) / (mass of |K|)
+
+within the error budget; storage() is the memory of the history.
+
+    from sim import Params, Engine, compare
+    from sim.compressed import CompressedEngine
+    p = Params.fromModule(values)
+    field = CompressedEngine(p, budget=1e-5)
+    print field.storage(), compare.compare(Engine(p), field, 1000)
+'''
+
+import numpy as np
+
+from sim.engine import Engine
+
+# dtype and error relative to the largest part of a slot of each compression
+compressions = {'int16'  : (np.int16,   0.5/32767),
+                'float16': (np.float16, 2.0**-11)}
+
+
+class CompressedEngine(Engine):
+    """Engine keeping the older slots of the history compressed."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the sparse rings itself
+
+    def __init__(self, p, budget=1e-5, compression='int16', exact=None, **options):
+        """Set up the field, the kernel rings and the history.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param budget: estimated relative error of the drive allowed
+        :type  budget: float
+        :param compression: 'int16' or 'float16'
+        :type  compression: string
+        :param exact: number of rings reading exact spectra, None to choose
+                      it from the budget
+        :type  exact: int
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        if compression not in compressions:
+            raise ValueError("compression must be 'int16' or 'float16', not %r" % (compression,))
+        self.budget = float(budget)
+        self.compression = compression
+        self.exact = exact
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Initialize the kernel rings and the number of exact rings.'''
+
+        Engine.finite(self)
+        if self.exact is None:
+            self.exact = 1
+            while self.exact < self.nrings and self.errorEstimate(self.exact) > self.budget:
+                self.exact += 1
+        self.exact = max(1, min(int(self.exact), self.nrings))
+        self.estimate = self.errorEstimate(self.exact)
+
+
+    def errorEstimate(self, exact):
+        """Return the estimated relative error of the drive with a number
+        of exact rings.
+
+        :param exact: number of rings reading exact spectra
+        :type  exact: int
+        :rtype: float
+
+        """
+
+        mass = self.ringMass()[:self.nrings]
+        total = mass.sum()
+        return compressions[self.compression][1]*mass[exact:].sum()/total if total else 0.0
+
+
+    def history(self, U0):
+        """Initialize the exact and the compressed slots to the spectrum U0
+        of S(V0).
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        self.U = np.empty((self.exact,)+U0.shape, dtype=self.ctype) # ring j < exact uses U[(head+j) % exact]
+        self.U[:] = U0
+        self.head = 0
+
+        older = self.nrings - self.exact # ring exact+i uses Q[(oldHead+i) % older]
+        qtype = compressions[self.compression][0]
+        self.Q = np.empty((max(older, 1),)+U0.shape+(2,), dtype=qtype)
+        self.scales = np.empty(max(older, 1))
+        self.oldHead = 0
+        for slot in xrange(older):
+            self.compress(U0, slot)
+
+
+    def compress(self, U, slot):
+        """Write a spectrum in a compressed slot.
+
+        :param U: spectrum of S(V)
+        :type  U: complex numpy 2D matrix
+        :param slot: slot of Q
+        :type  slot: int
+
+        """
+
+        parts = np.empty(U.shape+(2,))
+        parts[...,0] = U.real
+        parts[...,1] = U.imag
+        largest = np.abs(parts).max()
+        if self.compression == 'int16':
+            scale = largest/32767 if largest else 1.0
+            self.Q[slot] = np.rint(parts/scale)
+        else:
+            scale = largest if largest else 1.0
+            self.Q[slot] = parts/scale
+        self.scales[slot] = scale
+
+
+    def decompress(self, slot):
+        """Return the spectrum of a compressed slot.
+
+        :param slot: slot of Q
+        :type  slot: int
+        :rtype: complex numpy 2D matrix
+
+        """
+
+        parts = self.Q[slot].astype(self.ftype)
+        parts *= self.ftype(self.scales[slot])
+        return parts.view(self.ctype)[...,0]
+
+
+    def storage(self):
+        '''Return the bytes taken by the history.'''
+        return self.U.nbytes + self.Q.nbytes + self.scales.nbytes
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        L = self.Ki[0]*self.U[self.head]
+        for j in xrange(1, self.exact):
+            L += self.Ki[j]*self.U[(self.head+j) % self.exact]
+        older = self.nrings - self.exact
+        for i in xrange(older):
+            L += self.Ki[self.exact+i]*self.decompress((self.oldHead+i) % older)
+        return self.synapticfactor*self.space(L)
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the exact slots and
+        compress the one that gets the age of the first compressed ring.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        self.head = (self.head-1) % self.exact # the oldest exact slot becomes the newest
+        older = self.nrings - self.exact
+        if older:
+            self.oldHead = (self.oldHead-1) % older
+            self.compress(self.U[self.head], self.oldHead)
+        self.spectrum(S, out=self.U[self.head])
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+History of S(V) kept at a coarser time resolution for the far rings.
+
+The far rings see S(V) long ago, through a small part of the kernel. Level
+l of the history holds averages of the spectra over blocks of 2**l steps,
+aligned on the time since the start, and serves M*2**l rings:
+
+    level   block   rings (ages in steps)
+    0       1       0 .. M-1                 exact
+    1       2       M .. 3M-1
+    2       4       3M .. 7M-1
+    l       2**l    M(2**l-1) .. M(2**(l+1)-1)-1
+
+the last level ending at nrings. A block of level l is the average of two
+blocks of level l-1, made at the step where level l starts to read it. Ring
+j reads the block holding the step of age j; the rings that read the same
+block are summed first from the prefix sums Kc of the rings beyond M, so
+that a step also costs O(M log nrings) products.
+
+Each level keeps the blocks its rings read, plus the one the next level
+averages: M+1 for level 0, ceil(rings/2**l)+1 for the others, fewer for
+the last level, which serves the rings left up to nrings. When that is
+not fewer than nrings, M is nrings and the history is the one of Engine.
+K0 and Kc hold nrings+1 spectra, as Ki.
+
+The error of a level is the change of S(V) within its blocks, which the
+time scale of the field does not bound: with the steep sigmoid of
+values.py, the spectrum changes by more than its norm from a step to the
+next. So the error is measured while running: averaging the blocks a and
+b into level l, D[l] = max(D[l], D[l-1] + |a-b|/(|a|+|b|)) is the largest
+relative distance of a block of level l to the steps it holds, and
+
+    estimate = Σl D[l] · (mass of |K| in level l)/(mass of |K|)
+
+Before any measurement, D[l] is (2**l-1)/2 · dt/gamma, the change at the
+time scale gamma of the field, which chooses the first M. Whenever the
+estimate exceeds decimateTolerance, M is doubled until it does not, and
+the levels are rebuilt from the finest blocks at hand; the blocks made
+before that keep the error of the coarser levels until they age out of
+the rings, at most nrings steps later. A given slots keeps M fixed.
+
+The estimate bounds the error with a margin of 4 to 30 in the runs below,
+sim.compare.compareDrive of the kernel and input of values.py, c=5,
+against Engine over 400 steps at n=64 and 300 at n=128; the history is the
+one at the end, against the 3.01 and 23.86 MB of U:
+
+    n     alpha   tolerance   M             drive error   history
+    64    10000   1e-1        2 -> 32       9.3e-4        2.69 MB
+    64    10000   1e-2 .. 1e-4     -> 46    3e-16         3.01 MB
+    64    100     1e-1        2 -> 8        7.8e-3        1.64 MB
+    64    100     1e-2, 1e-3       -> 32    1.9e-4        2.69 MB
+    128   10000   1e-1        2 -> 64       4.5e-4        20.71 MB
+    128   10000   1e-2 .. 1e-4     -> 91    3e-16         23.86 MB
+    128   100     1e-1        2 -> 16       4.9e-3        12.06 MB
+    128   100     1e-2, 1e-3       -> 64    1.0e-4        20.71 MB
+
+alpha being the slope of the sigmoid S: with the one of values.py, a
+tolerance below 1e-1 keeps the full history.
+
+sim.compare.compareDrive checks the drive against the full history:
+
+    from sim import Params, Engine, compare
+    from sim.decimate import DecimatedEngine
+    p = Params.fromModule(values)
+    print compare.compareDrive(Engine(p), DecimatedEngine(p, decimateTolerance=1e-4), 1000)
+'''
+
+import numpy as np
+
+from sim.engine import Engine
+
+
+class DecimatedEngine(Engine):
+    """Engine keeping the history of the far rings at a coarser time
+    resolution."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the levels itself
+
+    def __init__(self, p, decimateTolerance=1e-4, slots=None, **options):
+        """Set up the field, the prefix sums of the kernel rings and the
+        levels of the history.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param decimateTolerance: estimated relative error of the drive
+        :type  decimateTolerance: float
+        :param slots: rings M read at full resolution, kept whatever the
+                      estimate, None to choose it from decimateTolerance,
+                      at least 2
+        :type  slots: int
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.decimateTolerance = float(decimateTolerance)
+        self.fixedSlots = slots is not None
+        self.slots = slots
+        self.deviation = {} # D[l]: largest relative distance of a block of level l to its steps
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Initialize the exact rings K0 and the prefix sums Kc of the rings beyond them.'''
+
+        self.mass = self.ringMass()[:self.nrings]
+        if self.slots is None:
+            self.slots = self.chooseSlots()
+        M = self.slots = self.fit(self.slots)
+
+        shape = self.spectrumShape()
+        self.K0 = np.empty((M,)+shape, dtype=self.ftype)
+        self.Kc = None # Kc[j-M]: sum of the rings M .. j-1
+        if M < self.nrings:
+            self.Kc = np.zeros((self.nrings-M+1,)+shape, dtype=self.ftype)
+        self.base = M
+        for start, stop, spectra in self.ringSpectra():
+            for j in xrange(start, stop):
+                if j < M:
+                    self.K0[j] = spectra[j-start]
+                else:
+                    np.add(self.Kc[j-M], spectra[j-start], out=self.Kc[j-M+1])
+
+        self.droppedMass = self.dropped() # fraction of |K| left out of the rings
+
+
+    def levels(self, M):
+        """Return the first ring of each level, the last one being nrings,
+        and the number of blocks each level keeps.
+
+        :param M: rings read at full resolution
+        :type  M: int
+        :returns: starts and sizes
+        :rtype: (list of ints, list of ints)
+
+        """
+
+        if M >= self.nrings:
+            return [0, self.nrings], [self.nrings]
+        starts = [0]
+        while starts[-1] < self.nrings:
+            starts.append(min(self.nrings, M*(2**len(starts)-1)))
+        sizes = []
+        for l in xrange(len(starts)-1):
+            w, rings = 2**l, starts[l+1]-starts[l]
+            if l < len(starts)-2: # and the block of age starts[l+1], averaged by the next level
+                sizes.append((rings+w-1)//w + 1)
+            else:
+                sizes.append((rings+w-2)//w + 1)
+        return starts, sizes
+
+
+    def fit(self, M):
+        """Return M, at least 2, or nrings when its levels would keep as
+        many blocks as the full history.
+
+        :param M: rings read at full resolution
+        :type  M: int
+        :rtype: int
+
+        """
+
+        M = max(2, int(M))
+        if M >= self.nrings or sum(self.levels(M)[1]) >= self.nrings:
+            return self.nrings
+        return M
+
+
+    def estimated(self, M):
+        """Return the estimated relative error of the drive with M rings
+        read at full resolution and the deviations D measured so far, the
+        ones not measured yet being (2**l-1)/2 steps of change at the time
+        scale gamma of the field.
+
+        :param M: rings read at full resolution
+        :type  M: int
+        :rtype: float
+
+        """
+
+        starts = self.levels(M)[0]
+        total = self.mass.sum()
+        rate = self.dt/self.gammafactor if self.gammafactor else 1.0 # change of S(V) per step
+        estimate = 0.0
+        for l in xrange(1, len(starts)-1):
+            D = max(self.deviation.get(l, 0.0), (2**l-1)/2.0*rate)
+            estimate += D*self.mass[starts[l]:starts[l+1]].sum()/total if total else 0.0
+        return estimate
+
+
+    def chooseSlots(self, M=2):
+        """Return the smallest power of two times M whose estimated error
+        stays within decimateTolerance, nrings at most.
+
+        :param M: smallest M
+        :type  M: int
+        :rtype: int
+
+        """
+
+        M = self.fit(M)
+        while M < self.nrings and self.estimated(M) > self.decimateTolerance:
+            M = self.fit(2*M)
+        self.estimate = self.estimated(M)
+        return M
+
+
+    def history(self, U0):
+        """Initialize the blocks of every level to the spectrum U0 of S(V0).
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        self.s = 0 # number of spectra recorded since time = 0
+        self.starts, sizes = self.levels(self.slots)
+        self.blocks = []
+        for size in sizes:
+            U = np.empty((size,)+U0.shape, dtype=self.ctype) # block b is in U[b % len(U)]
+            U[:] = U0
+            self.blocks.append(U)
+
+
+    def storage(self):
+        '''Return the bytes taken by the history.'''
+        return sum(U.nbytes for U in self.blocks)
+
+
+    def held(self, l, starts=None):
+        """Return the first and last blocks of level l that are kept at the
+        current step.
+
+        :param l: level
+        :type  l: int
+        :param starts: first ring of each level, None for self.starts
+        :type  starts: list of ints
+        :rtype: (int, int)
+
+        """
+
+        starts = starts or self.starts
+        w, first, stop = 2**l, starts[l], starts[l+1]
+        if l < len(starts)-2: # the next level averages the block of age stop
+            return (self.s-stop)//w, (self.s-first)//w
+        return (self.s-stop+1)//w, (self.s-first)//w
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        s = self.s
+        U = self.blocks[0]
+        L = self.K0[0]*U[s % len(U)]
+        for j in xrange(1, self.starts[1]):
+            L += self.K0[j]*U[(s-j) % len(U)]
+
+        for l in xrange(1, len(self.starts)-1):
+            U = self.blocks[l]
+            w = 2**l
+            first, stop = self.starts[l], self.starts[l+1]
+            for b in xrange((s-first)//w, (s-stop+1)//w-1, -1):
+                # rings reading the steps b*w .. b*w+w-1
+                j0 = max(first, s-b*w-w+1)
+                j1 = min(stop, s-b*w+1)
+                L += (self.Kc[j1-self.base]-self.Kc[j0-self.base])*U[b % len(U)]
+        return self.synapticfactor*self.space(L)
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the first level,
+        average into the next levels the blocks that they read from now on
+        and refine the levels when the error estimate exceeds
+        decimateTolerance.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        self.s += 1
+        s = self.s
+        U = self.blocks[0]
+        self.spectrum(S, out=U[s % len(U)])
+        for l in xrange(1, len(self.blocks)):
+            # the block b is first read when its first step gets the age starts[l]
+            w = 2**l
+            if (s-self.starts[l]) % w == 0:
+                b = (s-self.starts[l])//w
+                finer, U = self.blocks[l-1], self.blocks[l]
+                x, y = finer[(2*b) % len(finer)], finer[(2*b+1) % len(finer)]
+                U[b % len(U)] = 0.5*(x + y)
+                norm = np.linalg.norm(x) + np.linalg.norm(y)
+                if norm:
+                    D = self.deviation.get(l-1, 0.0) + np.linalg.norm(x-y)/norm
+                    self.deviation[l] = max(self.deviation.get(l, 0.0), D)
+
+        self.estimate = self.estimated(self.slots)
+        if not self.fixedSlots and self.estimate > self.decimateTolerance and self.slots < self.nrings:
+            self.refine(self.chooseSlots(2*self.slots))
+
+
+    def refine(self, M):
+        """Rebuild the levels for M rings read at full resolution, a block
+        being the average of the finest blocks kept over its steps.
+
+        :param M: rings read at full resolution, more than self.slots
+        :type  M: int
+
+        """
+
+        s = self.s
+        def finest(t):
+            # finest block kept that holds the step t
+            for l, U in enumerate(self.blocks):
+                oldest, newest = self.held(l)
+                if oldest <= t//2**l <= newest:
+                    return U[(t//2**l) % len(U)]
+            raise ValueError("step %d is not in the history" % t)
+
+        starts, sizes = self.levels(M)
+        blocks = []
+        for l, size in enumerate(sizes):
+            U = np.empty((size,)+self.spectrumShape(), dtype=self.ctype)
+            w = 2**l
+            oldest, newest = self.held(l, starts)
+            for b in xrange(oldest, newest+1):
+                total = np.zeros(self.spectrumShape(), dtype=self.ctype)
+                for t in xrange(b*w, b*w+w):
+                    total += finest(t)
+                U[b % size] = total/w
+            blocks.append(U)
+
+        K0 = np.empty((M,)+self.K0.shape[1:], dtype=self.ftype)
+        K0[:len(self.K0)] = self.K0
+        for start, stop, spectra in self.ringSpectra(len(self.K0), M):
+            K0[start:stop] = spectra
+        if M >= self.nrings:
+            self.Kc = None
+        else: # the differences of Kc do not change with the first sum
+            self.Kc, self.base = self.Kc[M-self.base:].copy(), M
+        self.K0,self.blocks, self.starts, self.slots = K0, blocks, starts, M
+        self.estimate = self.estimated(M)
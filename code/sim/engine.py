@@ -0,0 +1,705 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Window-free simulation engine of the dynamic neural field.
+
+The engine owns the field voltage V, the history U of past firing rate
+spectra and the kernel rings Ki. It never opens a window, so it can be used
+on machines without a display::
+
+    import values
+    from sim import Params, Engine
+
+    field = Engine(Params.fromModule(values))
+    field.advance(1000)  # 1000 iterations of dt seconds
+    V = field.V
+
+The graph3D window is an optional viewer on top of the engine
+(see sim.viewer).
+'''
+
+import numpy         as np
+from numpy.fft import fft2,rfft2,fftshift,ifftshift
+from sim.params import Params
+from sim import stepper, ringsum, parallel, transforms
+chunkBytes = 1 << 23 # bytes of the ring spectra transformed together
+
+# dtypes of Ki, of U and of V for each precision
+precisions = {'double': (np.float64, np.complex128, np.float64),
+              'mixed' : (np.float32, np.complex64,  np.float64),
+              'single': (np.float32, np.complex64,  np.float32)}
+
+
+class Engine(object):
+    """Integrate a dynamic neural field with finite transmission speed."""
+
+    # options among realFFT, layout, workers and pipeline that a subclass
+    # does not support, with the only value it accepts
+    fixedOptions = {}
+
+    def __init__(self, p, realFFT=False, layout='ring', tile=None, precision='double', workers=1, tolerance=None, backend=None, pipeline=False, inplace=False):
+        """Set up the field, the kernel rings and the history of S(V).
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param realFFT: keep Ki and U as half spectra of real FFTs (rfft2),
+                        which halves their memory and the work of the ring sum
+        :type  realFFT: boolean
+        :param layout: memory layout of Ki and U, 'ring' for one spectrum
+                       per ring or 'pixel' for the rings of one frequency
+                       next to each other (see sim.ringsum)
+        :type  layout: string
+        :param tile: number of pixels reduced at once in the pixel layout,
+                     None to fit a tile in the cache
+        :type  tile: int
+        :param precision: 'double' for float64 everywhere, 'single' for Ki,
+                          U, the FFTs and V in float32, 'mixed' for Ki, U
+                          and the FFTs in float32 and V in float64. Only
+                          the 'fftw' backend transforms in float32: numpy.fft
+                          transforms in float64 and the result is rounded.
+                          See sim.compare for the error against 'double'.
+        :type  precision: string
+        :param workers: number of threads of the ring sum, of the FFTs of
+                        the steps and of the transforms of the kernel rings
+                        (see sim.parallel; the speedup on several cores has
+                        not been measured)
+        :type  workers: int
+        :param tolerance: drop the outer rings that hold at most this
+                          fraction of the mass of |K| (see truncate()),
+                          None to keep the rings up to the corners
+        :type  tolerance: float
+        :param backend: 'fftw' for the FFTW plans of sim.transforms,
+                        'numpy' for numpy.fft, None for 'fftw' when pyfftw
+                        is installed
+        :type  backend: string
+        :param pipeline: sum the rings 1..nrings-1 of the next step on a
+                         thread while the current step ends, 'ring' layout
+                         only (see pipelinedSum())
+        :type  pipeline: boolean
+        :param inplace: do the steps in the arrays of a workspace made once
+                        (see workspace()) instead of new temporaries
+        :type  inplace: boolean
+
+        """
+
+        given = {'realFFT': bool(realFFT), 'layout': layout, 'workers': max(1, int(workers)), 'pipeline': bool(pipeline)}
+        for name in sorted(self.fixedOptions):
+            if given[name] != self.fixedOptions[name]:
+                raise ValueError("%s only supports %s=%r, not %r" % (type(self).__name__, name, self.fixedOptions[name], given[name]))
+
+        if precision not in precisions:
+            raise ValueError("precision must be 'double', 'single' or 'mixed', not %r" % (precision,))
+
+        if layout not in ('ring', 'pixel'):
+            raise ValueError("layout must be 'ring' or 'pixel', not %r" % (layout,))
+        if pipeline and layout != 'ring':
+            raise ValueError("pipeline needs the 'ring' layout")
+
+        if backend is None:
+            backend = 'numpy' if transforms.pyfftw is None else 'fftw'
+        if backend not in ('numpy', 'fftw'):
+            raise ValueError("backend must be 'numpy' or 'fftw', not %r" % (backend,))
+        if backend == 'fftw' and transforms.pyfftw is None:
+            raise ValueError("the 'fftw' backend needs pyfftw")
+
+        if not isinstance(p, Params):
+            p = Params.fromModule(p)
+        self.params = p
+
+        self.epoc = 0 # start at the beginning
+        self.realFFT = realFFT # half spectra of real FFTs
+        self.layout  = layout  # memory layout of Ki and U
+        self.tile    = tile    # pixels of a tile of the pixel layout
+        self.precision = precision
+        self.workers   = max(1, int(workers)) # threads of the steps and of the kernel construction
+        self.backend   = backend
+        self.pipeline  = pipeline
+        self.pending   = None # sum of the rings >= 1 of the next step, see pipelinedSum()
+        self.work      = None # arrays of the steps done in place, made once the field is set up
+        self.ftype, self.ctype, self.vtype = precisions[precision] # dtypes of Ki, U and V
+        self.fft = np.fft # FFTs of the steps with the 'numpy' backend, in double precision
+
+        # note: casting as floats to ensure avoidance of integer division
+        self.dt             = float(p.dt)        # temporal discretisation (seconds).
+        self.l              = float(p.l)         # size of the field
+        self.n              = int(p.n)           # discretized spatial units
+        self.gammafactor    = float(p.gamma)     # prefactor of first derivative in second order operator
+        self.etafactor      = float(p.eta)       # eta value of second derivative
+        self.c              = float(p.c)         # c, transmission speed
+        # V, U, I and the noise are kept in the natural FFT order, where the
+        # center of the field is at [0,0], see natural()
+        self.Vexcite        = self.natural(np.array(p.V0, dtype=self.vtype) * np.ones((self.n,self.n), dtype=self.vtype)) # field voltage at time = 0
+        self.noisy          = self.natural(self.cast(p.noiseVcont)) # noise +- applied to V(t>=0)
+        self.random         = np.random.RandomState(p.seed) # noise generator of this simulation
+        if self.etafactor != 0.0:
+            self.Uexcite    = self.natural(np.array(p.Uexcite, dtype=self.vtype) * np.ones((self.n,self.n), dtype=self.vtype))
+        if p.I is None:                          # I, input from external source
+            self.I          = 0
+        else:
+            self.I          = self.natural(self.cast(p.I))
+        self.K_             = self.kernel(p.K)   # K, synaptic connectivity kernel
+        self.updateS        = p.updateS          # firing rate
+        self.updateI        = p.updateI          # I during the simulation
+        self.updateK        = p.updateK          # K during the simulation
+        # updateI and updateK take the simulated time in seconds, rounded to
+        # 12 decimals so that tests such as time == 0.5 hold, and return the
+        # new matrix or None to keep the current one
+
+        # Peel field into several 'onion rings' of width ringWidth.
+        radius      = np.sqrt((self.n/2.0)**2 + (self.n/2.0)**2) # max radius in field: hypotenuse
+        self.ringWidth   = max(1.0, self.c*self.dt*self.n/self.l)  # width of a ring in # of grid intervals
+        self.nrings = 1 + int(radius/self.ringWidth)             # number of rings
+        if tolerance is not None:
+            self.nrings = self.truncate(tolerance)               # rings where K matters
+        self.finite()                                   # set finite axon speed paradigm
+        self.history(self.spectrum(self.updateS(self.Vexcite)).real)
+
+        self.synapticfactor = self.l**2/float(self.n**2) # synapse kernel factor
+        if p.endTime<0:
+            self.simRange = float("inf")
+        else:
+            self.simRange = int(p.endTime/self.dt) #  duration of simulation
+        self.endtime = p.endTime
+
+        if inplace:
+            self.work = self.workspace()
+        self.stepper = stepper.stepFunction(self) # step of this configuration
+
+
+    def finite(self): # def finite :)
+        '''Initialize the finite axon speed paradigm. '''
+
+        # Precompute Fourier transform for each kernel ring since they're
+        # only used in the Fourier domain
+        if self.layout == 'pixel':
+            self.Ki = np.zeros((int(np.prod(self.spectrumShape())),self.nrings), dtype=self.ftype)
+        else:
+            self.Ki = np.zeros((self.nrings,)+self.spectrumShape(), dtype=self.ftype) # self.Ki is our kernel in layers in Fourier space
+        for start, stop, spectra in self.ringSpectra():
+            if self.layout == 'pixel':
+                self.Ki[:,start:stop] = spectra.reshape(stop-start, -1).T
+            else:
+                self.Ki[start:stop] = spectra
+
+        self.droppedMass = self.dropped() # fraction of |K| left out of Ki
+
+
+    def history(self, U0):
+        """Initialize the past S(V) values (from t=-Tmax to t=0, where Tmax =
+        nrings*dt) to the spectrum U0 of S(V0).
+
+        Since we're working in the Fourier domain, past values are
+        directly stored using their Fourier transform. U is a circular
+        buffer: ring j uses U[(self.head+j) % self.nrings], or the column
+        (self.head+j) % self.nrings in the pixel layout.
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        if self.layout == 'pixel':
+            self.U    = np.empty((U0.size, self.nrings), dtype=self.ctype)
+            self.U[:] = U0.reshape(-1, 1)
+        else:
+            self.U    = np.empty((self.nrings,)+U0.shape, dtype=self.ctype)
+            self.U[:] = U0
+        self.head = 0 # slot of the newest spectrum
+
+
+    def dropped(self):
+        '''Return the fraction of the mass of |K| in the rings beyond nrings.'''
+
+        mass  = self.ringMass()
+        total = mass.sum()
+        return mass[self.nrings:].sum()/total if total else 0.0
+
+
+    def ringMass(self):
+        """Return the mass of |K| in each ring, up to the corners of the
+        field, whatever nrings is.
+
+        :returns: integral of |K| over each ring (mm^2 times the unit of K)
+        :rtype: numpy array of floats
+
+        """
+
+        mass = np.bincount(self.ringIndex().ravel(), weights=np.abs(ifftshift(self.K_)).ravel())
+        return mass*self.l**2/float(self.n**2)
+
+
+    def truncate(self, tolerance):
+        """Return the number of rings needed to keep all but a fraction
+        tolerance of the mass of |K|.
+
+        The outer rings of kernels that vanish far from the center, such as
+        the exponentials of values.py, hold nothing but rounding noise, yet
+        each one costs a spectrum of Ki, a slot of U and a product per step.
+        The fraction actually dropped is kept in droppedMass by finite(),
+        see dropped().
+        An updateK keeps the number of rings chosen for the first K.
+
+        :param tolerance: fraction of the mass of |K| that may be dropped
+        :type  tolerance: float
+        :rtype: int
+
+        """
+
+        mass = self.ringMass()
+        tail = np.cumsum(mass[::-1])[::-1] # tail[i]: mass of the rings i and beyond
+        return max(1, int(np.sum(tail > tolerance*mass.sum())))
+
+
+    def ringIndex(self):
+        """Return the ring of every pixel, in the natural FFT order.
+
+        Ring i holds the pixels at a distance D of the center with
+        i*ringWidth <= D < (i+1)*ringWidth: the disc of radius ringWidth
+        for ring 0, then annuli of width ringWidth.
+
+        :rtype: numpy 2D matrix of ints
+
+        """
+
+        def distance(x,y):
+            return np.sqrt((x-self.n//2)**2+(y-self.n//2)**2)
+        D=np.fromfunction(distance,(self.n,self.n))
+        ring = (D // self.ringWidth).astype(int)
+        # same rings as the tests D < epoc*ringWidth of discs of growing epoc
+        ring[D >= (ring+1)*self.ringWidth] += 1
+        ring[D < ring*self.ringWidth] -= 1
+        return ifftshift(ring)
+
+
+    def ringSpectra(self, start=0, stop=None, chunk=None):
+        """Generate the spectra of the kernel rings start..stop-1, a chunk of
+        rings at a time, so that all the rings never are in memory at once.
+
+        The rings are cut from K with one ring index per pixel and the
+        rings of a chunk are transformed together, in double precision.
+        With self.workers > 1, that many chunks are transformed at once by
+        a pool of threads.
+
+        :param start: first ring
+        :type  start: int
+        :param stop: ring after the last one, None for nrings
+        :type  stop: int
+        :param chunk: number of rings transformed together, None for
+                      chunkBytes of spectra
+        :type  chunk: int
+        :returns: first ring, ring after the last one and the real part of
+                  their spectra as kept in Ki
+        :rtype: generator of (int, int, numpy array)
+
+        """
+
+        if stop is None:
+            stop = self.nrings
+        if chunk is None:
+            chunk = max(1, chunkBytes // (16*self.n*self.n))
+
+        # pixels sorted by ring: ring i is order[bounds[i]:bounds[i+1]]
+        ring   = self.ringIndex().ravel()
+        K      = ifftshift(self.K_).ravel()
+        order  = np.argsort(ring, kind='mergesort')
+        bounds = np.searchsorted(ring[order], np.arange(self.nrings+1))
+        if self.backend == 'fftw':
+            transform = lambda rings: transforms.forward(rings, self.realFFT, 1)
+        else:
+            transform = rfft2 if self.realFFT else fft2
+
+        def spectra(first):
+            last  = min(first+chunk, stop)
+            pixel = order[bounds[first]:bounds[last]]
+            rings = np.zeros((last-first, self.n*self.n))
+            rings[ring[pixel]-first, pixel] = K[pixel]
+            return first, last, np.real(transform(rings.reshape(last-first, self.n, self.n)))
+
+        firsts = range(start, stop, chunk)
+        if self.workers > 1:
+            pool = parallel.threadPool(self.workers)
+            for i in range(0, len(firsts), self.workers):
+                for result in pool.map(spectra, firsts[i:i+self.workers]):
+                    yield result
+        else:
+            for first in firsts:
+                yield spectra(first)
+
+
+    def spectrumShape(self):
+        '''Return the shape of the spectra in Ki and U.'''
+
+        if self.realFFT:
+            return (self.n, self.n//2+1) # the other half is the complex conjugate
+        return (self.n, self.n)
+
+
+    def natural(self, field):
+        """Return a field of the user, centered as x in values.py, in the
+        natural FFT order of the engine. Numbers and None are returned as is.
+
+        Only permuting the pixels, this keeps the results bit for bit the
+        same as transforming fftshift(fft2(ifftshift(S))) at every step.
+
+        :param field: a field, a number or None
+        :type  field: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if np.ndim(field) == 2:
+            return ifftshift(field)
+        return field
+
+
+    def kernel(self, K):
+        """Return a kernel of the user as an n x n field, centered as x in
+        values.py: a number is the same weight at every distance.
+
+        :param K: a kernel or a number
+        :type  K: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        return np.broadcast_to(K, (self.n,self.n))
+
+
+    def cast(self, field):
+        """Return a field in the dtype of V. Numbers and None are returned
+        as is.
+
+        :param field: a field, a number or None
+        :type  field: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if np.ndim(field) == 2:
+            return np.asarray(field, dtype=self.vtype)
+        return field
+
+
+    def centered(self, field):
+        """Return a field of the engine centered as x in values.py, the
+        inverse of natural().
+
+        :param field: a field, a number or None
+        :type  field: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if np.ndim(field) == 2:
+            return fftshift(field)
+        return field
+
+
+    def workspace(self):
+        """Return the arrays of the steps done in place (inplace=True): the
+        ring sum, the update of V and U and the firing rate (when updateS
+        takes an argument out, as in values.py) then allocate no array.
+        With the 'fftw' backend the FFTs work in the arrays of their plans,
+        so that a step without noise allocates nothing. numpy.fft allocates
+        the results of its FFTs, and numpy.random the noise of each step,
+        which are copied into the workspace. See sim.compare.allocations.
+
+        :returns: 'spectrum': the ring sum in Fourier space,
+                  'product': a product of the ring sum,
+                  'tile': the wrapped rings of a tile of the pixel layout,
+                  'outer': the sums of the rings >= 1 of pipelinedSum(),
+                  two spectra used in turn (with pipeline=True),
+                  'outerProduct': a product of these sums,
+                  'L': the synaptic input,
+                  'W': the increment of V or of U,
+                  'noise': the noise, in the dtype of the draws,
+                  'S': the firing rate,
+                  'Sf': the firing rate in the dtype of the FFTs
+        :rtype: dictionary
+
+        """
+
+        field, spectrum = self.Vexcite.shape, self.spectrumShape()
+        work = {'spectrum': np.empty(spectrum, dtype=self.ctype),
+                'product' : np.empty(spectrum, dtype=self.ctype),
+                'L'       : np.empty(field, dtype=self.ftype),
+                'W'       : np.empty(field, dtype=self.vtype),
+                'noise'   : np.empty(field, dtype=np.result_type(np.float64, self.vtype)),
+                'S'       : np.empty(field, dtype=self.vtype),
+                'Sf'      : np.empty(field, dtype=self.ftype)}
+        if self.layout == 'pixel':
+            work['tile'] = np.empty(2*(self.tile or ringsum.tileSize(self.nrings)), dtype=self.ftype)
+        if self.pipeline:
+            work['outer'] = np.empty((2,)+spectrum, dtype=self.ctype)
+            work['outerProduct'] = np.empty(spectrum, dtype=self.ctype)
+        return work
+
+
+    def noise(self, out):
+        """Draw the noise of a step in the natural FFT order, times
+        noisy, into an array: natural(random.normal(0,1,(n,n)))*noisy.
+
+        :param out: array of the noise, float64
+        :type  out: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        R = self.random.normal(0,1.0,(self.n,self.n))
+        h = self.n//2
+        m = self.n-h # ifftshift: out[i] = R[(i+h) % n]
+        out[:m,:m] = R[h:,h:]
+        out[:m,m:] = R[h:,:h]
+        out[m:,:m] = R[:h,h:]
+        out[m:,m:] = R[:h,:h]
+        out *= self.noisy
+        return out
+
+
+    def spectrum(self, S, out=None):
+        """Return the Fourier transform of a field as kept in Ki and U.
+
+        Fields and spectra are both in the natural FFT order.
+
+        :param S: a field in the natural FFT order
+        :type  S: numpy 2D matrix
+        :param out: array to write the spectrum in, None for a new one
+        :type  out: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if self.work is not None and S.dtype != self.ftype:
+            self.work['Sf'][...] = S
+            S = self.work['Sf']
+        else:
+            S = S.astype(self.ftype, copy=False)
+        if self.backend == 'fftw':
+            if out is None:
+                return transforms.forward(S, self.realFFT, self.workers)
+            return transforms.forward(S, self.realFFT, self.workers, out=out)
+        if self.workers > 1:
+            F = parallel.fft2(S, self.fft, self.workers, real=self.realFFT)
+            if out is None:
+                return F.astype(self.ctype, copy=False)
+            out[...] = F
+            return out
+        transform = self.fft.rfft2 if self.realFFT else self.fft.fft2
+        if out is None:
+            return transform(S).astype(self.ctype, copy=False)
+        out[...] = transform(S)
+        return out
+
+
+    def space(self, L, out=None):
+        """Return the field of a spectrum, the inverse of spectrum().
+
+        :param L: a spectrum as kept in Ki and U
+        :type  L: numpy 2D matrix
+        :param out: array of ftype to write the field in, None for a new
+                    one
+        :type  out: numpy 2D matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if self.backend == 'fftw':
+            return transforms.inverse(L, self.realFFT, self.n, self.workers, out=out).astype(self.ftype, copy=False)
+        if self.workers > 1:
+            L = parallel.ifft2(L, self.fft, self.workers, real=self.realFFT, n=self.n)
+        elif self.realFFT:
+            L = self.fft.irfft2(L, s=(self.n,self.n))
+        else:
+            L = self.fft.ifft2(L).real
+        if out is None:
+            return L.astype(self.ftype, copy=False)
+        out[...] = L
+        return out
+
+
+    @property
+    def V(self):
+        '''The field voltage at the current epoc, centered as x in values.py.'''
+        return self.centered(self.Vexcite)
+
+
+    @property
+    def time(self):
+        '''The simulated time in seconds.'''
+        return self.epoc*self.dt
+
+
+    def finished(self):
+        '''Return whether or not the maximum simulation time is reached.'''
+        return self.epoc > self.simRange
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        # multiply firing rate and synaptic kernel over space and time then transform
+        work = self.work
+        if self.nrings == 1: # instantaneous transmission: one kernel, no delay
+            L = np.multiply(self.Ki.reshape(self.spectrumShape()), self.U.reshape(self.spectrumShape()),
+                            out=None if work is None else work['spectrum'])
+        elif self.pipeline:
+            L = self.pipelinedSum()
+        elif self.workers > 1:
+            L = ringsum.parallelSum(self.Ki, self.U, self.head, parallel.threadPool(self.workers), self.workers,
+                                    layout=self.layout, tile=self.tile).reshape(self.spectrumShape())
+        elif work is not None and self.layout == 'pixel':
+            L = ringsum.pixelMajor(self.Ki, self.U, self.head, tile=self.tile,
+                                   out=work['spectrum'].reshape(-1), scratch=work['tile']).reshape(self.spectrumShape())
+        elif self.layout == 'pixel':
+            L = ringsum.pixelMajor(self.Ki, self.U, self.head, tile=self.tile).reshape(self.spectrumShape())
+        elif work is not None:
+            L = ringsum.ringMajor(self.Ki, self.U, self.head, out=work['spectrum'], scratch=work['product'])
+        else:
+            L = ringsum.ringMajor(self.Ki, self.U, self.head)
+        if work is None:
+            return self.synapticfactor*self.space(L)
+        L = self.space(L, out=work['L'])
+        L *= self.synapticfactor
+        return L
+
+
+    def pipelinedSum(self):
+        """Return the ring sum in Fourier space from the sum of the rings
+        1..nrings-1 made on a thread during the previous step, and start the
+        one of the next step.
+
+        Only ring 0 reads the spectrum recorded at the end of the previous
+        step: the other rings of the next step read the slots of ages
+        0..nrings-2, which record() leaves alone, so that their sum runs
+        behind the FFTs and the update of V. It is made again in this thread
+        when Ki, U or head changed since it was started, such as after an
+        updateK.
+
+        Ring 0 is added last to sim.ringsum.outerSum, as sim.ringsum.ringMajor
+        does, so that the results are bit for bit the ones of pipeline=False,
+        whether or not the sum of the thread was used. With inplace=True the
+        sums are written in turn in the two spectra of work['outer'], so that
+        the thread never writes in the one being used.
+
+        The sum runs on the shared pool parallel.threadPool(1); close()
+        waits for the sum still running, and parallel.closePools() stops
+        the thread.
+
+        :returns: the ring sum in Fourier space
+        :rtype: complex numpy 2D matrix
+
+        """
+
+        Ki, U, head, work = self.Ki, self.U, self.head, self.work
+        if self.pending is not None and self.pending[0] is Ki and self.pending[1] is U and self.pending[2] == head:
+            L = self.pending[3].get()
+        else:
+            self.close() # a sum of an older Ki, U or head may still write in outer
+            if work is None:
+                L = ringsum.outerSum(Ki, U, head)
+            else:
+                L = ringsum.outerSum(Ki, U, head, out=work['outer'][0], scratch=work['product'])
+        if work is None:
+            L += Ki[0]*U[head]
+        else:
+            L += np.multiply(Ki[0], U[head], out=work['product'])
+        following = (head-1) % self.nrings # head of the next step
+        if work is None:
+            arguments = (Ki, U, following)
+        else: # the buffer of outer that L is not in
+            other = work['outer'][1] if np.may_share_memory(L, work['outer'][0]) else work['outer'][0]
+            arguments = (Ki, U, following, other, work['outerProduct'])
+        self.pending = (Ki, U, following,
+                        parallel.threadPool(1).apply_async(ringsum.outerSum, arguments))
+        return L
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the history U.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        # the oldest slot becomes the newest
+        if self.nrings == 1: # instantaneous transmission: only the last S(V)
+            self.spectrum(S, out=self.U.reshape(self.spectrumShape()))
+            return
+        self.head = (self.head-1) % self.nrings
+        if self.layout == 'pixel':
+            self.U[:,self.head] = self.spectrum(S, out=None if self.work is None else self.work['product']).ravel()
+        else:
+            self.spectrum(S, out=self.U[self.head])
+
+
+    def step(self):
+        """Simulate the field over one dt.
+
+        The work is done by a step function compiled for the configuration
+        of the simulation (see sim.stepper). The potential is then in V.
+
+        """
+
+        self.stepper(self)
+
+
+    def close(self):
+        '''Wait for the ring sum started by pipelinedSum() and drop it.'''
+
+        if self.pending is not None:
+            self.pending[3].wait()
+            self.pending = None
+
+
+    def __enter__(self):
+        '''Return the engine, closed at the end of a with block.'''
+        return self
+
+
+    def __exit__(self, *exception):
+        '''Close the engine at the end of a with block.'''
+        self.close()
+
+
+    def advance(self, steps):
+        """Simulate the field over several dt, stopping at the maximum
+        simulation time, and return its potential, V.
+
+        :param steps: number of iterations
+        :type  steps: int
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        for i in xrange(steps):
+            if self.finished():
+                break
+            self.step()
+        return self.V
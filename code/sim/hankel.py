@@ -0,0 +1,329 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Radial solver for radially symmetric fields.
+
+When V0, Uexcite, I and K only depend on the distance x to the center and
+there is no noise, the field stays radially symmetric. RadialEngine keeps V,
+I and S(V) as radial profiles over m points r, and replaces the 2D FFTs by
+the Hankel transform of order 0, under which a convolution of radial
+functions also is a product:
+
+    F(k) = 2π ∫ f(r) J0(k r) r dr
+
+The transform is the quasi-discrete Hankel transform over the disc of
+radius R = l/√2 holding the square field: r and k are the zeros of J0
+scaled by R and 1/R, and a transform is a product by one m x m matrix. The
+spectrum of ring j is the sum over its pixels of K·J0(k |x|), the average
+over the directions of the spectrum of the ring of Engine. A step costs
+nrings*m products and two m x m matrix products, instead of nrings*n^2
+products and two 2D FFTs of n^2 pixels.
+
+The radial solver simulates the disc, not the torus of Engine: the results
+are the same as long as the activity stays away from the edges of the
+field, where the torus wraps around. Measured with a Gaussian I making a
+bump and an exponential K, 300 steps, error relative to the largest |V| of
+Engine:
+
+    n     m     within 10 mm   anywhere   ms per step   Engine
+    128   128   6.2e-3         0.31       0.048         12.0
+    128   64    6.2e-3         0.29       0.035         11.9
+    256   256   2.5e-3         0.25       0.11          92.0
+
+J0 and its zeros come from scipy.special when scipy is there, else from
+the polynomial approximations of Abramowitz and Stegun (9.4.1 to 9.4.6),
+good to about 1e-8.
+
+V and centered() render the profile back into the 2D field, r and Vexcite
+are the profile itself:
+
+    from sim import Params
+    from sim.hankel import RadialEngine
+    field = RadialEngine(Params.fromModule(values))
+    field.advance(1000)
+    V = field.V                  # n x n, centered as x in values.py
+    r, profile = field.r, field.Vexcite
+'''
+
+import numpy as np
+try:
+    from scipy.special import j0, j1, jn_zeros
+except ImportError:
+    j0 = j1 = jn_zeros = None
+
+from sim.params import Params
+from sim.engine import Engine
+
+tolerance = 1e-9 # departure from radial symmetry allowed, relative to the largest value of a field
+
+
+def bessel0(x):
+    """Return the Bessel function of the first kind of order 0.
+
+    :param x: real numbers
+    :type  x: numpy array
+    :rtype: numpy array
+
+    """
+
+    if j0 is not None:
+        return j0(x)
+    x = np.abs(np.asarray(x, dtype=np.float64))
+    small = x <= 3.0
+    J = np.empty_like(x)
+    y = (x[small]/3.0)**2
+    J[small] = 1.0+y*(-2.2499997+y*(1.2656208+y*(-0.3163866+y*(0.0444479+y*(-0.0039444+y*0.0002100)))))
+    z = x[~small]
+    y = 3.0/z
+    f = 0.79788456+y*(-0.00000077+y*(-0.00552740+y*(-0.00009512+y*(0.00137237+y*(-0.00072805+y*0.00014476)))))
+    theta = z-0.78539816+y*(-0.04166397+y*(-0.00003954+y*(0.00262573+y*(-0.00054125+y*(-0.00029333+y*0.00013558)))))
+    J[~small] = f*np.cos(theta)/np.sqrt(z)
+    return J
+
+
+def bessel1(x):
+    """Return the Bessel function of the first kind of order 1.
+
+    :param x: real numbers
+    :type  x: numpy array
+    :rtype: numpy array
+
+    """
+
+    if j1 is not None:
+        return j1(x)
+    x = np.asarray(x, dtype=np.float64)
+    sign = np.sign(x)
+    x = np.abs(x)
+    small = x <= 3.0
+    J = np.empty_like(x)
+    y = (x[small]/3.0)**2
+    J[small] = x[small]*(0.5+y*(-0.56249985+y*(0.21093573+y*(-0.03954289+y*(0.00443319+y*(-0.00031761+y*0.00001109))))))
+    z = x[~small]
+    y = 3.0/z
+    f = 0.79788456+y*(0.00000156+y*(0.01659667+y*(0.00017105+y*(-0.00249511+y*(0.00113653-y*0.00020033)))))
+    theta = z-2.35619449+y*(0.12499612+y*(0.00005650+y*(-0.00637879+y*(0.00074348+y*(0.00079824-y*0.00029166)))))
+    J[~small] = f*np.cos(theta)/np.sqrt(z)
+    return sign*J
+
+
+def zeros(count):
+    """Return the first positive zeros of J0.
+
+    :param count: number of zeros
+    :type  count: int
+    :rtype: numpy array
+
+    """
+
+    if jn_zeros is not None:
+        return jn_zeros(0, count)
+    # McMahon's expansion, then Newton's method with J0' = -J1
+    b = (np.arange(1, count+1)-0.25)*np.pi
+    z = b + 1.0/(8*b) - 31.0/(384*b**3)
+    for i in xrange(5):
+        z += bessel0(z)/bessel1(z)
+    return z
+
+
+class RadialEngine(Engine):
+    """Engine simulating the radial profile of a radially symmetric field."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the radial spectra itself
+
+    def __init__(self, p, points=None, check=True, **options):
+        """Set up the profiles, the Hankel transform, the kernel rings and
+        the history.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param points: points m of the profiles, None for n
+        :type  points: int
+        :param check: check that V0, Uexcite, I and K are radially
+                      symmetric, False to take the symmetry as declared and
+                      only use their average over the directions
+        :type  check: boolean
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+        :raises ValueError: for noise or a field that is not radially
+                            symmetric
+
+        The fields returned by updateI and updateK must stay radially
+        symmetric: only their average over the directions is used.
+
+        """
+
+        if not isinstance(p, Params):
+            p = Params.fromModule(p)
+        if p.noiseVcont is not None and np.any(p.noiseVcont):
+            raise ValueError('noise breaks the symmetry: RadialEngine needs noiseVcont = None')
+
+        # pixels of the user's fields grouped by their distance to the center
+        n = p.n
+        x, y = np.indices((n, n)) - n//2
+        distances, self.group = np.unique((x**2+y**2).ravel(), return_inverse=True)
+        self.distances = np.sqrt(distances)*float(p.l)/n # distance of each group in mm
+        self.count = np.bincount(self.group)
+        if check:
+            for name in ('V0', 'Uexcite', 'I', 'K'):
+                if not self.radial(getattr(p, name)):
+                    raise ValueError('%s is not radially symmetric' % name)
+
+        # quasi-discrete Hankel transform over the disc of radius R
+        self.points = n if points is None else int(points)
+        R = float(p.l)/np.sqrt(2)
+        z = zeros(self.points+1)
+        S = z[-1]
+        z = z[:-1]
+        self.r = z*R/S   # radii of the profiles
+        self.k = z/R     # wavenumbers of the spectra
+        J1 = bessel1(z)**2
+        self.Y = bessel0(np.outer(z, z)/S)
+        self.forward = 4*np.pi*R**2/(S**2*J1) # F = Y·(forward*f)
+        self.inverse = 1.0/(np.pi*R**2*J1)    # f = Y·(inverse*F)
+
+        options['realFFT'] = False
+        Engine.__init__(self, p, **options)
+
+
+    def radial(self, field):
+        """Return whether a field of the user is radially symmetric.
+        Numbers and None are.
+
+        :param field: a field, a number or None
+        :type  field: numpy 2D matrix
+        :rtype: boolean
+
+        """
+
+        if np.ndim(field) != 2:
+            return True
+        field = np.ravel(field)
+        mean = np.bincount(self.group, weights=field)/self.count
+        return np.abs(field - mean[self.group]).max() <= tolerance*np.abs(field).max()
+
+
+    def natural(self, field):
+        """Return the radial profile of a field of the user, centered as x
+        in values.py: its average over the directions, at the radii r.
+        Numbers and None are returned as is.
+
+        :param field: a field, a number or None
+        :type  field: numpy 2D matrix
+        :rtype: numpy 1D array
+
+        """
+
+        if np.ndim(field) == 2:
+            mean = np.bincount(self.group, weights=np.ravel(field))/self.count
+            return np.interp(self.r, self.distances, mean).astype(np.asarray(field).dtype)
+        return field
+
+
+    def centered(self, field):
+        """Return the 2D field of a radial profile, centered as x in
+        values.py, the inverse of natural().
+
+        :param field: a profile, a number or None
+        :type  field: numpy 1D array
+        :rtype: numpy 2D matrix
+
+        """
+
+        if np.ndim(field) == 1:
+            n = self.n
+            return np.interp(self.distances, self.r, field)[self.group].reshape(n, n)
+        return field
+
+
+    def spectrumShape(self):
+        '''Return the shape of the spectra in Ki and U.'''
+        return (self.points,)
+
+
+    def finite(self):
+        """Initialize the Hankel transforms of the kernel rings: ring j is
+        the sum over its pixels of K·J0(k |x|)."""
+
+        self.ctype = self.ftype # the spectra of radial functions are real
+        n = self.n
+        # pixels grouped by ring and distance
+        ring = np.fft.fftshift(self.ringIndex()).ravel()
+        span = self.group.max()+1
+        keys, inverse = np.unique(ring*span + self.group, return_inverse=True)
+        weights = np.bincount(inverse, weights=np.ravel(self.K_))
+        rings = keys//span
+        distances = self.distances[keys % span]
+        bounds = np.searchsorted(rings, np.arange(self.nrings+1))
+
+        self.Ki = np.zeros((self.nrings, self.points), dtype=self.ftype)
+        for j in xrange(self.nrings):
+            a, b = bounds[j], bounds[j+1]
+            self.Ki[j] = np.dot(weights[a:b], bessel0(np.outer(distances[a:b], self.k)))
+        self.droppedMass = self.dropped()
+
+
+    def spectrum(self, S, out=None):
+        """Return the Hankel transform of a profile, as kept in Ki and U.
+
+        :param S: a profile
+        :type  S: numpy 1D array
+        :param out: array to write the spectrum in, None for a new one
+        :type  out: numpy 1D array
+        :rtype: numpy 1D array
+
+        """
+
+        F = np.dot(self.Y, self.forward*S)
+        if out is None:
+            return F.astype(self.ftype)
+        out[...] = F
+        return out
+
+
+    def space(self, L):
+        """Return the profile of a spectrum, the inverse of spectrum().
+
+        :param L: a spectrum as kept in Ki and U
+        :type  L: numpy 1D array
+        :rtype: numpy 1D array
+
+        """
+
+        return np.dot(self.Y, self.inverse*L).astype(self.ftype)
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings on the profile, L.
+
+        :returns: a radial profile
+        :rtype: numpy 1D array
+
+        """
+
+        # rings 0..split-1 read the slots head..nrings-1, the others wrap around
+        split = self.nrings - self.head
+        L = np.einsum('ij,ij->j', self.Ki[:split], self.U[self.head:])
+        if self.head:
+            L += np.einsum('ij,ij->j', self.Ki[split:], self.U[:self.head])
+        return self.synapticfactor*self.space(L)
@@ -1,5 +1,34 @@
+#!/usr/bin/env python
+# -- coding: utf-8 --
+
+import numpy as np
+import values
+from sim.params import Params
+from sim.engine import Engine
+
+
 class WindUp():
 
     def __init__(self):
-        import dnf
-        dnf.Data()
\ No newline at end of file
+        from sim import viewer
+        p = Params.fromModule(values)
+
+        # Which data to show
+        # 1 = show V matrix after V updates
+        # 2 = show V0 matrix - do not update V
+        # 3 = show input matrix
+        # 4 = show kernel matrix
+        showData = int(p.showData)
+
+        # if running updates is not chosen,
+        # display only time=0 data
+        if showData == 2: # only show V at time=0
+            viewer.display(p.V0, 'V0min: %.12f     V0max: %.12f' %(np.min(p.V0),np.max(p.V0)), p.l)
+        elif showData == 3 and p.updateI is None: # only show I at time = 0
+            viewer.display(p.I, 'Imin: %.12f     Imax: %.12f' %(np.min(p.I),np.max(p.I)), p.l)
+        elif showData == 4 and p.updateK is None: # only show K at time = 0
+            viewer.display(p.K, 'Kmin: %.12f     Kmax: %.12f' %(np.min(p.K),np.max(p.K)), p.l)
+
+        # simulate over time (beyond t=0)
+        else:
+            viewer.Viewer(Engine(p), showData)
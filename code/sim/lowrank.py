@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Low rank factorization of the kernel rings along the ring axis.
+
+The stack Ki of shape (nrings, ...) is factorized as
+
+    Ki[j] ~ Σq C[q] · poles[q]**j          (q = 0..r-1)
+
+with r complex poles shared by all wavenumbers. The ring sum is then
+
+    L = Σj Ki[j]·U(t-j) ~ Σq C[q] · P[q](t),   P[q](t) = Σj poles[q]**j · U(t-j)
+
+and each running projection P[q] is updated in O(n^2) when a spectrum
+enters the history and the one of age nrings leaves it:
+
+    P[q](t) = poles[q]·P[q](t-1) + U(t) - poles[q]**nrings · U(t-nrings)
+
+so a step costs O(r·n^2) instead of O(nrings·n^2). The poles are found by
+a matrix pencil on the principal ring profiles of Ki (see realize()).
+
+The factorization only pays off when Ki is redundant along the ring axis.
+The rings of width one grid interval of values.py are thin annuli whose
+spectra oscillate as J0(k·r) with a different frequency at each
+wavenumber, and no r < nrings/2 reaches 1e-3 for them: realize() then
+raises ValueError, and LowRankEngine warns and sums the rings exactly, as
+Engine does.
+
+    from sim import Params
+    from sim.lowrank import LowRankEngine
+    field = LowRankEngine(Params.fromModule(values), rankTolerance=1e-4)
+'''
+
+import warnings
+
+import numpy as np
+
+from sim.engine import Engine
+
+maxModulus = 0.999 # largest modulus of the poles, so that rounding in the projections dies out
+
+
+def realize(Ki, tolerance, maxRank=None):
+    """Return the poles and amplitudes of the smallest realization of Ki
+    within a tolerance.
+
+    :param Ki: kernel rings in Fourier space
+    :type  Ki: numpy array of shape (nrings, ...)
+    :param tolerance: relative Frobenius error allowed on Ki
+    :type  tolerance: float
+    :param maxRank: largest number of poles tried, None for nrings//2
+    :type  maxRank: int
+    :returns: poles (r complex numbers of modulus <= maxModulus),
+              amplitudes C of shape (r,)+Ki.shape[1:] and the relative
+              error reached
+    :rtype: tuple of (numpy array, numpy array, float)
+    :raises ValueError: when no realization of at most maxRank poles
+                        reaches the tolerance
+
+    """
+
+    nrings = len(Ki)
+    Y = Ki.reshape(nrings, -1).astype(np.float64)
+    norm = np.sqrt((Y**2).sum())
+    if norm == 0.0:
+        return np.zeros(1, dtype=complex), np.zeros((1,)+Ki.shape[1:], dtype=complex), 0.0
+
+    # principal ring profiles: Y ~ profiles . basis
+    u, s, basis = np.linalg.svd(Y, full_matrices=False)
+    tail = np.sqrt(np.cumsum((s**2)[::-1])[::-1]) # tail[i]: error of the first i profiles
+    keep = max(1, int(np.sum(tail > 0.25*tolerance*norm)))
+    profiles = u[:,:keep]*s[:keep]
+    left = tail[keep] if keep < len(s) else 0.0
+
+    # matrix pencil on the Hankel matrices of all the profiles
+    width = nrings//2
+    if maxRank is None:
+        maxRank = width
+    H = np.vstack([np.array([profiles[i:i+width+1,m] for i in xrange(nrings-width)]) for m in xrange(keep)])
+    vh = np.linalg.svd(H, full_matrices=False)[2]
+
+    powers = np.arange(nrings)[:,None]
+    error = np.inf
+    for r in xrange(1, min(maxRank, width)+1):
+        V = vh[:r].conj().T
+        poles = np.linalg.eigvals(np.linalg.pinv(V[:-1]).dot(V[1:]))
+        outside = np.abs(poles) > maxModulus # undamped modes would keep the rounding
+        poles[outside] *= maxModulus/np.abs(poles[outside])
+        Z = poles[None,:]**powers
+        A = np.linalg.lstsq(Z, profiles, rcond=None)[0]
+        error = np.sqrt(((Z.dot(A)-profiles).real**2).sum() + left**2)/norm
+        if error <= tolerance:
+            return poles, A.dot(basis[:keep]).reshape((r,)+Ki.shape[1:]), error
+    raise ValueError('no realization of at most %d poles reaches %g (error %.3g): '
+                     'the kernel rings are not redundant enough, use Engine' % (min(maxRank, width), tolerance, error))
+
+
+class LowRankEngine(Engine):
+    """Engine summing the rings through r running projections of the
+    history."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the projections itself
+
+    def __init__(self, p, rankTolerance=1e-4, maxRank=None, **options):
+        """Set up the field, the realization of the kernel rings and the
+        running projections.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param rankTolerance: relative Frobenius error allowed on Ki
+        :type  rankTolerance: float
+        :param maxRank: largest number of projections, None for nrings//2
+        :type  maxRank: int
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        When Ki has no realization within rankTolerance, the rings are
+        summed exactly, as by Engine, with a warning.
+
+        """
+
+        self.rankTolerance = float(rankTolerance)
+        self.maxRank       = maxRank
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Initialize the poles and amplitudes of the kernel rings.'''
+
+        Engine.finite(self)
+        try:
+            poles, C, self.fitError = realize(self.Ki, self.rankTolerance, self.maxRank)
+        except (ValueError, np.linalg.LinAlgError) as error:
+            warnings.warn('LowRankEngine sums the rings exactly: %s' % error)
+            self.rank = None # no realization: Ki and U are used as by Engine
+            return
+        del self.Ki # only the realization is used
+        self.rank  = len(poles)
+        self.poles = poles.astype(self.ctype)
+        self.polesR = (poles**self.nrings).astype(self.ctype) # weight of the spectrum leaving
+        self.C = C.astype(self.ctype)
+        if hasattr(self, 'U'): # updateK: project the history on the new poles
+            self.project()
+
+
+    def history(self, U0):
+        """Initialize the history to the spectrum U0 of S(V0) and its
+        projections.
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        Engine.history(self, U0)
+        if self.rank is not None:
+            self.project()
+
+
+    def project(self):
+        '''Compute the projections P[q] = Σj poles[q]**j · U(t-j) of the history.'''
+
+        self.P = np.zeros((self.rank,)+self.U.shape[1:], dtype=self.ctype)
+        for j in xrange(self.nrings):
+            Uj = self.U[(self.head+j) % self.nrings]
+            for q in xrange(self.rank):
+                self.P[q] += self.poles[q]**j * Uj
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if self.rank is None:
+            return Engine.ringSum(self)
+        L = self.C[0]*self.P[0]
+        for q in xrange(1, self.rank):
+            L += self.C[q]*self.P[q]
+        return self.synapticfactor*self.space(L)
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the history and to the
+        projections, and take out the spectrum leaving the history.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        if self.rank is None:
+            Engine.record(self, S)
+            return
+        new = self.spectrum(S)
+        self.head = (self.head-1) % self.nrings # the oldest slot becomes the newest
+        old = self.U[self.head]
+        for q in xrange(self.rank):
+            self.P[q] *= self.poles[q]
+            self.P[q] += new
+            self.P[q] -= self.polesR[q]*old
+        self.U[self.head] = new
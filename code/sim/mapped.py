@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Kernel rings and history in memory-mapped files, for grids larger than RAM.
+
+At n = 4096 with 2900 rings, Ki and U take 16 bytes * 2900 * 4096^2 = 780 GB
+in double precision. MappedEngine keeps them in two files, Ki.dat and U.dat,
+and streams the ring sum over them a chunk of rings at a time: a thread reads
+the next chunk while the current one is summed, so that the reads from the
+disk overlap the products.
+
+bandwidth() tells which of the two is the bottleneck: when the summing
+thread waits for the reads most of the time, the disk is; otherwise the CPU
+is, and a faster disk would not help.
+
+    from sim import Params
+    from sim.mapped import MappedEngine
+    field = MappedEngine(Params.fromModule(values), directory='/scratch/dnf')
+    field.advance(100)
+    print field.bandwidth()
+    field.close()
+
+A temporary directory (directory=None) is removed by close(), at the end of
+a with block, or at the exit of Python for the engines never closed:
+
+    with MappedEngine(Params.fromModule(values)) as field:
+        field.advance(100)
+'''
+
+import atexit
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from sim.engine import Engine, chunkBytes
+
+temporaries = set() # temporary directories of the engines not closed yet
+
+
+def removeTemporaries():
+    '''Remove the temporary directories of the engines not closed.'''
+
+    while temporaries:
+        shutil.rmtree(temporaries.pop(), ignore_errors=True)
+
+atexit.register(removeTemporaries)
+
+
+class MappedEngine(Engine):
+    """Engine keeping Ki and U in memory-mapped files."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() reads the rings from the file chunk by chunk
+
+    def __init__(self, p, directory=None, chunk=None, **options):
+        """Set up the field and the files of the kernel rings and of the
+        history.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param directory: where to write Ki.dat and U.dat, None for a
+                          temporary directory removed by close()
+        :type  directory: string
+        :param chunk: rings read at once, None for chunkBytes of Ki and U
+        :type  chunk: int
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.temporary = directory is None
+        self.directory = tempfile.mkdtemp(prefix='dnf') if directory is None else directory
+        if self.temporary:
+            temporaries.add(self.directory)
+        self.chunk = chunk
+        self.readBytes = 0   # bytes read by the ring sums
+        self.readTime  = 0.0 # seconds of the reads, in the read-ahead thread
+        self.waitTime  = 0.0 # seconds the ring sums waited for the reads
+        self.sumTime   = 0.0 # seconds of the ring sums
+        self.reader = ThreadPool(1)
+        self.reading = None  # read of the next chunk, None when the ring sum must read its first chunk itself
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Write the kernel rings in Ki.dat, a chunk of rings at a time.'''
+
+        shape = (self.nrings,)+self.spectrumShape()
+        self.Ki = None # unmap the rings of the previous K
+        self.Ki = np.memmap(os.path.join(self.directory, 'Ki.dat'), dtype=self.ftype, mode='w+', shape=shape)
+        for start, stop, spectra in self.ringSpectra():
+            self.Ki[start:stop] = spectra
+        self.Ki.flush()
+        self.droppedMass = self.dropped()
+
+        if self.chunk is None:
+            ring = np.dtype(self.ftype).itemsize + np.dtype(self.ctype).itemsize
+            self.chunk = max(1, chunkBytes // (ring*int(np.prod(shape[1:]))))
+
+
+    def history(self, U0):
+        """Write the spectrum U0 of S(V0) in every slot of U.dat.
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        self.U = np.memmap(os.path.join(self.directory, 'U.dat'), dtype=self.ctype, mode='w+', shape=(self.nrings,)+U0.shape)
+        for slot in xrange(self.nrings):
+            self.U[slot] = U0
+        self.head = 0 # slot of the newest spectrum
+        self.reading = self.reader.apply_async(self.read, (0,)) # first chunk of the next ring sum
+
+
+    def read(self, first):
+        """Read the rings first..first+chunk-1 and the slots of U they use.
+
+        :param first: first ring of the chunk
+        :type  first: int
+        :returns: the rings and their spectra of S(V), in memory
+        :rtype: tuple of 2 numpy arrays
+
+        """
+
+        st = time.time()
+        last = min(first+self.chunk, self.nrings)
+        Ki = np.array(self.Ki[first:last])
+        slot = (self.head+first) % self.nrings
+        wrap = slot + last-first - self.nrings # slots after the end of U.dat
+        if wrap > 0:
+            U = np.concatenate((self.U[slot:], self.U[:wrap]))
+        else:
+            U = np.array(self.U[slot:slot+last-first])
+        self.readTime  += time.time() - st
+        self.readBytes += Ki.nbytes + U.nbytes
+        return Ki, U
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L,
+        reading the next chunk of rings while summing the current one.
+        The first chunk is read from the end of record(), or here when the
+        ring sum is made again before record().
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        st = time.time()
+        L = None
+        for first in xrange(0, self.nrings, self.chunk):
+            wait = time.time()
+            if self.reading is None: # first chunk, not read ahead
+                Ki, U = self.read(first)
+            else:
+                Ki, U = self.reading.get()
+            self.waitTime += time.time() - wait
+            if first+self.chunk < self.nrings:
+                self.reading = self.reader.apply_async(self.read, (first+self.chunk,))
+            else:
+                self.reading = None
+            for j in xrange(len(Ki)):
+                if L is None:
+                    L = Ki[j]*U[j]
+                else:
+                    L += Ki[j]*U[j]
+        self.sumTime += time.time() - st
+        return self.synapticfactor*self.space(L)
+
+
+    def record(self, S):
+        """Write the spectrum of the firing rate S(V) in the oldest slot of
+        U.dat.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        self.head = (self.head-1) % self.nrings
+        self.U[self.head] = self.spectrum(S)
+        self.reading = self.reader.apply_async(self.read, (0,))
+
+
+    def bandwidth(self):
+        """Return the bandwidth of the reads of the ring sums so far.
+
+        :returns: 'bytes': bytes read,
+                  'diskRate': bytes per second of the reads alone,
+                  'rate': bytes per second of the ring sums,
+                  'waiting': fraction of the ring sums spent waiting for
+                  the reads, near 1 when the disk is the bottleneck and
+                  near 0 when the CPU is
+        :rtype: dictionary
+
+        """
+
+        return {'bytes'    : self.readBytes,
+                'diskRate' : self.readBytes/self.readTime if self.readTime else 0.0,
+                'rate'     : self.readBytes/self.sumTime if self.sumTime else 0.0,
+                'waiting'  : self.waitTime/self.sumTime if self.sumTime else 0.0}
+
+
+    def close(self):
+        '''Stop the read-ahead thread and remove the temporary files.'''
+
+        Engine.close(self)
+        self.reader.close()
+        self.Ki = self.U = None
+        if self.temporary:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            temporaries.discard(self.directory)
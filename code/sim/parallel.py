@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Threads of the steps of an engine with workers > 1.
+
+The products of the ring sum and the 1D FFTs release the GIL of Python, so
+that threads can run them on several cores at once. The speedup on several
+cores has not been measured (see sim.compare). The frequency plane is cut
+into one tile of rows per worker for the ring sum (see
+sim.ringsum.parallelSum), and a 2D FFT is done as the 1D FFTs of blocks of
+rows, then of blocks of columns, in the order of numpy.fft.fft2: the
+results are bit for bit the ones of one thread.
+
+The pools of threads are shared by the engines with the same number of
+workers, so that parameter sweeps do not start new threads for each run,
+including the pool of one thread of Engine(pipeline=True). closePools()
+stops them, and runs at the exit of Python.
+compare.speedup measures the time of a step for several numbers of workers.
+'''
+
+import atexit
+
+import numpy as np
+from multiprocessing.pool import ThreadPool
+
+pools = {} # pool of threads of each number of workers
+
+
+def threadPool(workers):
+    """Return the pool of threads shared by the engines with this number
+    of workers.
+
+    :param workers: number of threads
+    :type  workers: int
+    :rtype: multiprocessing.pool.ThreadPool
+
+    """
+
+    if workers not in pools:
+        pools[workers] = ThreadPool(workers)
+    return pools[workers]
+
+
+def closePools():
+    '''Stop the threads of every pool; the next threadPool() starts new ones.'''
+
+    while pools:
+        workers, pool = pools.popitem()
+        pool.close()
+        pool.join()
+
+atexit.register(closePools)
+
+
+def blocks(size, parts):
+    """Return the bounds of parts nearly equal blocks of size items.
+
+    :param size: number of items
+    :type  size: int
+    :param parts: number of blocks, at most size
+    :type  parts: int
+    :rtype: list of (first, stop) pairs
+
+    """
+
+    bounds = np.linspace(0, size, min(parts, size)+1).astype(int)
+    return zip(bounds[:-1], bounds[1:])
+
+
+def fft2(S, fft, workers, real=False):
+    """Return the 2D FFT of a field, computed by threads.
+
+    :param S: a real field
+    :type  S: numpy 2D matrix
+    :param fft: module of the 1D transforms, numpy.fft
+    :type  fft: module
+    :param workers: number of threads
+    :type  workers: int
+    :param real: half spectrum of rfft2 instead of fft2
+    :type  real: boolean
+    :rtype: complex numpy 2D matrix
+
+    """
+
+    rows, columns = S.shape
+    transform = fft.rfft if real else fft.fft
+    F = np.empty((rows, columns//2+1 if real else columns), dtype=transform(S[:1], axis=1).dtype)
+    pool = threadPool(workers)
+
+    def alongRows(block):
+        first, stop = block
+        F[first:stop] = transform(S[first:stop], axis=1)
+    def alongColumns(block):
+        first, stop = block
+        F[:,first:stop] = fft.fft(F[:,first:stop], axis=0)
+    pool.map(alongRows, blocks(rows, workers))
+    pool.map(alongColumns, blocks(F.shape[1], workers))
+    return F
+
+
+def ifft2(L, fft, workers, real=False, n=None):
+    """Return the real field of a 2D spectrum, computed by threads.
+
+    :param L: a spectrum
+    :type  L: complex numpy 2D matrix
+    :param fft: module of the 1D transforms, numpy.fft
+    :type  fft: module
+    :param workers: number of threads
+    :type  workers: int
+    :param real: L is the half spectrum of rfft2
+    :type  real: boolean
+    :param n: columns of the field of a half spectrum
+    :type  n: int
+    :rtype: numpy 2D matrix
+
+    """
+
+    rows, columns = L.shape
+    pool = threadPool(workers)
+    G = np.empty((rows, columns), dtype=fft.ifft(L[:1], axis=1).dtype)
+    if real:
+        # ifft of the columns, then irfft of the rows, as numpy.fft.irfft2
+        V = np.empty((rows, n), dtype=fft.irfft(L[:1], n, axis=1).dtype)
+        def alongColumns(block):
+            first, stop = block
+            G[:,first:stop] = fft.ifft(L[:,first:stop], axis=0)
+        def alongRows(block):
+            first, stop = block
+            V[first:stop] = fft.irfft(G[first:stop], n, axis=1)
+        pool.map(alongColumns, blocks(columns, workers))
+        pool.map(alongRows, blocks(rows, workers))
+        return V
+
+    # ifft of the rows, then of the columns, as numpy.fft.ifft2
+    def alongRows(block):
+        first, stop = block
+        G[first:stop] = fft.ifft(L[first:stop], axis=1)
+    def alongColumns(block):
+        first, stop = block
+        G[:,first:stop] = fft.ifft(G[:,first:stop], axis=0)
+    pool.map(alongRows, blocks(rows, workers))
+    pool.map(alongColumns, blocks(columns, workers))
+    return G.real
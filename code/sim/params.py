@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Parameters of one simulation.
+
+A Params object holds the values that values.py sets as module globals, so
+that many configurations can live side by side in one process::
+
+    import values
+    from sim import Params, Engine
+
+    base  = Params.fromModule(values)
+    a,b,x = base.grid()
+    runs  = [Engine(base.copy(c=c, seed=1)) for c in (10.0, 100.0, 1000.0)]
+    for run in runs:
+        run.advance(500)
+'''
+
+import numpy as np
+
+
+class Params(object):
+    """The values of a simulation, as described in values.py."""
+
+    # name: default value
+    defaults = {'showData'   : 1,    # which data to show in the graph
+                'endTime'    : -1,   # simulation duration (seconds or -1:infinity)
+                'dt'         : None, # temporal discretization (seconds)
+                'gamma'      : 1.0,  # γ first order
+                'eta'        : 0.0,  # η second order
+                'c'          : None, # axonal transmission speed (mm/s)
+                'l'          : None, # field size (mm)
+                'n'          : None, # number of field discretized units
+                'V0'         : 0.0,  # field voltage at time=0
+                'noiseVcont' : None, # noise applied to the voltage at t>=0
+                'Uexcite'    : None, # data for the second order calculation
+                'I'          : None, # input from external source
+                'K'          : None, # synaptic connectivity kernel
+                'updateS'    : None, # firing rate, S(V)
+                'updateI'    : None, # optional I(time) during the simulation
+                'updateK'    : None, # optional K(time) during the simulation
+                'seed'       : None} # seed of the noise, None: unpredictable
+
+    def __init__(self, **values):
+        """Set the values of the simulation.
+
+        :param values: any name of Params.defaults
+        :raises TypeError: for an unknown name
+        :raises ValueError: for a missing or badly shaped value
+
+        """
+
+        for name in values:
+            if name not in self.defaults:
+                raise TypeError('unknown simulation parameter: %s' % name)
+        for name, default in self.defaults.items():
+            setattr(self, name, values.get(name, default))
+
+        for name in ('dt','c','l','n','K','updateS'):
+            if getattr(self, name) is None:
+                raise ValueError('the simulation parameter %s must be set' % name)
+        self.n = int(self.n)
+        for name in ('V0','noiseVcont','Uexcite','I','K'):
+            value = getattr(self, name)
+            if value is not None and not np.isscalar(value) and np.shape(value) != (self.n,self.n):
+                raise ValueError('%s must be a number or a numpy array of size n*n' % name)
+        if self.eta != 0.0 and self.Uexcite is None:
+            raise ValueError('Uexcite must be set if eta is not 0.0')
+
+
+    @classmethod
+    def fromModule(cls, module, **changes):
+        """Read the values of a module laid out as values.py.
+
+        :param module: module such as values
+        :type  module: module
+        :param changes: values replacing the ones of the module
+        :returns: the parameters
+        :rtype: Params
+
+        """
+
+        values = {}
+        for name in cls.defaults:
+            if hasattr(module, name):
+                values[name] = getattr(module, name)
+        if 'c' not in values and hasattr(module, 'axonSpeed'): # c, old value
+            values['c'] = module.axonSpeed
+        if 'updateS' not in values and hasattr(module, 'S'):   # archaic method
+            values['updateS'] = module.S
+        values.update(changes)
+        return cls(**values)
+
+
+    def copy(self, **changes):
+        """Return new parameters with some values changed.
+
+        :param changes: values to change
+        :returns: the parameters
+        :rtype: Params
+
+        """
+
+        values = dict((name, getattr(self, name)) for name in self.defaults)
+        values.update(changes)
+        return self.__class__(**values)
+
+
+    def grid(self):
+        """Return the square field as in values.py: a, b and x = √(a²+b²).
+
+        :returns: 3 numpy arrays of size n*n
+        :rtype: tuple
+
+        """
+
+        a,b= np.meshgrid(np.arange(-self.l/2.0,self.l/2.0,self.l/float(self.n)),np.arange(-self.l/2.0,self.l/2.0,self.l/float(self.n)))
+        x  = np.sqrt(a**2+b**2)
+        return a, b, x
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Uniformly partitioned convolution over time of the ring sum.
+
+For each wavenumber the ring sum is a causal filter over time with nrings
+taps: L(s) = Σj Ki[j]·x(s-j), x(s) being the spectrum of S(V) recorded at
+the s-th step. The taps are cut into partitions of B taps:
+
+    partition 0     taps 0..B-1     summed directly at every step
+    partition p     taps pB..pB+B-1 for the B steps of a block at once, by
+                    an FFT over time (overlap-save on 2B samples)
+
+Partitions p >= 1 only read spectra at least B steps old, so at the first
+step of a block the contributions of all of them to the B steps of the
+block are known. The spectra over time of the pairs of consecutive blocks
+of x are kept in a delay line and multiplied by the spectra over time of
+the partitions of Ki:
+
+    tail = ifft( Σp H[p] · Z[k-p] )[B:2B]    (k: the block starting now)
+
+A step costs B real by complex products, and at a block start an FFT and
+an inverse FFT over 2B samples plus 2B(P-1) complex products per pixel, P
+being the number of partitions. Amortized, this is about
+B + 2·nrings/B + 4·log2(2B) per pixel, smallest near B = sqrt(2·nrings):
+the cost grows as sqrt(nrings) instead of nrings. A logarithmic growth
+would need non-uniform partitions, whose long FFTs exceed the memory of the
+delay line of these fields. The steps starting a block are the slow ones.
+
+The sum differs from the direct one by rounding only (about 1e-15 relative
+in double precision).
+
+    from sim import Params
+    from sim.partition import PartitionEngine
+    field = PartitionEngine(Params.fromModule(values))
+'''
+
+import numpy as np
+
+from sim.engine import Engine
+
+
+class PartitionEngine(Engine):
+    """Engine summing the rings by a uniformly partitioned convolution over
+    time.
+
+    The engine takes about 2.7 times the memory of the kernel rings and
+    history of Engine (Ki and U). The spectra over time H of the partitions
+    and the delay line Z each hold 2B complex spectra for each of the P-1
+    partitions, about 2·nrings spectra: H takes about four times the bytes
+    of the real rings Ki, Z twice those of U. The last 2B spectra X, the B
+    tails and the direct taps K0 come on top. The pairs of blocks in Z
+    overlap, so they cannot share a buffer with the spectra recorded.
+    Measured with the kernel -4·exp(-|x|/3)/(18π), l = 30 and c = 5:
+
+        n     nrings  B   P    Ki + U of Engine   PartitionEngine
+        64    46      10  5    4.5 MB             12.8 MB (2.83x)
+        128   91      13  7    35.8 MB            93.7 MB (2.62x)
+        256   182     19  10   286.3 MB           787.0 MB (2.75x)
+
+    """
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the partitions itself
+
+    def __init__(self, p, block=None, **options):
+        """Set up the field, the partitions of the kernel rings and the delay
+        line.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param block: number of taps of a partition B, None for
+                      sqrt(2*nrings)
+        :type  block: int
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.block = block
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Initialize the direct taps K0 and the spectra over time H of the
+        partitions.'''
+
+        Engine.finite(self)
+        if self.block is None:
+            self.block = int(round(np.sqrt(2*self.nrings)))
+        B = self.block = max(1, min(int(self.block), self.nrings))
+        self.partitions = -(-self.nrings // B) # P
+
+        # taps padded to P*B, partition 0 stays in space
+        taps = np.zeros((self.partitions*B,)+self.Ki.shape[1:], dtype=self.ftype)
+        taps[:self.nrings] = self.Ki
+        del self.Ki
+        self.K0 = taps[:B].copy()
+        parts = taps[B:].reshape((self.partitions-1, B)+taps.shape[1:])
+        self.H = np.fft.fft(parts, n=2*B, axis=1).astype(self.ctype)
+
+        if hasattr(self, 'Z'): # updateK: the rest of the block with the new K
+            self.tails(self.s//B)
+
+
+    def history(self, U0):
+        """Initialize the last 2B spectra, the delay line and the tail of
+        the first block to the spectrum U0 of S(V0).
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        B = self.block
+        self.s = 0 # number of spectra recorded since time = 0
+        self.X = np.empty((2*B,)+U0.shape, dtype=self.ctype) # x(s) is in X[s % 2B]
+        self.X[:] = U0
+        self.Z = np.empty((max(1, self.partitions-1), 2*B)+U0.shape, dtype=self.ctype)
+        self.Z[:] = np.fft.fft(self.X, axis=0)
+        self.tail = np.zeros((B,)+U0.shape, dtype=self.ctype)
+        self.tails(0)
+
+
+    def pair(self, k):
+        """Add to the delay line the spectrum over time of the blocks k-2
+        and k-1 of x, the last 2B spectra recorded.
+
+        :param k: block starting now
+        :type  k: int
+
+        """
+
+        B = self.block
+        order = (np.arange(2*B) + k*B) % (2*B) # x((k-2)B)..x(kB-1), oldest first
+        self.Z[(k-1) % len(self.Z)] = np.fft.fft(self.X[order], axis=0)
+
+
+    def tails(self, k):
+        """Compute the contributions of the partitions p >= 1 to the B steps
+        of the block k.
+
+        :param k: block starting now
+        :type  k: int
+
+        """
+
+        B = self.block
+        if self.partitions < 2:
+            return
+        Y = self.H[0]*self.Z[(k-1) % len(self.Z)]
+        for p in xrange(2, self.partitions):
+            Y += self.H[p-1]*self.Z[(k-p) % len(self.Z)]
+        self.tail[:] = np.fft.ifft(Y, axis=0)[B:]
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        B = self.block
+        L = self.K0[0]*self.X[self.s % (2*B)]
+        for j in xrange(1, B):
+            L += self.K0[j]*self.X[(self.s-j) % (2*B)]
+        L += self.tail[self.s % B]
+        return self.synapticfactor*self.space(L)
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the last spectra,
+        starting a new block every B steps.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        B = self.block
+        self.s += 1
+        if self.s % B == 0: # the block k needs x up to the block k-1
+            k = self.s//B
+            if self.partitions > 1:
+                self.pair(k)
+            self.tails(k)
+        self.spectrum(S, out=self.X[self.s % (2*B)])
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Kernel rings stored as radial profiles of their spectra.
+
+A ring of a radially symmetric K is an annulus, whose spectrum is nearly a
+function of |k| alone. ProfileEngine keeps each ring as a profile G[j] over
+bins of |k| and one map from the wavenumbers to their bin, shared by all the
+rings:
+
+    Ki[j] ~ G[j][index]
+
+so that the rings take nrings * (n/√2 * resolution) numbers instead of
+nrings * n^2. The profile of a bin is the mean of the spectrum over it, the
+best fit in the least squares sense, and the ring sum expands each profile
+into a buffer before multiplying it by its spectrum of S(V).
+
+anisotropy is ||Ki - G[index]|| / ||Ki||: how far the rings are from
+radially symmetric spectra, through the square grid or through a K that
+is not radially symmetric. The rings one grid interval wide of values.py
+are far from it (anisotropy 0.4), but their differences mostly cancel in
+the sum over the rings: kernelAnisotropy is the same ratio for the sum.
+Measured with values.py, c = 20 mm/s (91 rings), n = 128, 300 steps:
+
+    resolution   anisotropy   kernelAnisotropy   error of V   Ki (MB)
+    Engine       0            0                  0            11.9
+    1            0.44         0.14               3.0e-2       0.13
+    4            0.39         0.0034             9.0e-5       0.33
+
+(error relative to the largest |V| of Engine). Expanding the profiles makes
+a step about 35% slower.
+
+    from sim import Params
+    from sim.profiles import ProfileEngine
+    field = ProfileEngine(Params.fromModule(values))
+    print field.anisotropy
+'''
+
+import numpy as np
+
+from sim.engine import Engine
+
+
+class ProfileEngine(Engine):
+    """Engine keeping the kernel rings as radial profiles of their
+    spectra."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() sums the radial profiles itself
+
+    def __init__(self, p, resolution=4.0, **options):
+        """Set up the field, the profiles of the kernel rings and the
+        history.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param resolution: bins of |k| per wavenumber step 2π/l
+        :type  resolution: float
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.resolution = float(resolution)
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Initialize the radius index map and the profiles of the rings.'''
+
+        # bin of |k| of each wavenumber, in the natural FFT order
+        n = self.n
+        kx = np.minimum(np.arange(n), n-np.arange(n))
+        ky = np.arange(n//2+1) if self.realFFT else kx
+        radius = np.sqrt(kx[:,None]**2 + ky[None,:]**2)
+        self.index = np.rint(radius*self.resolution).astype(np.int32)
+        bins = self.index.max()+1
+        count = np.maximum(np.bincount(self.index.ravel(), minlength=bins), 1) # no wavenumber in some fine bins
+
+        self.G = np.zeros((self.nrings, bins), dtype=self.ftype)
+        error = norm = 0.0
+        total = np.zeros(self.index.size)  # sum of the rings
+        totalError = np.zeros(self.index.size)
+        for start, stop, spectra in self.ringSpectra():
+            for i in xrange(stop-start):
+                spectrum = spectra[i].ravel()
+                G = np.bincount(self.index.ravel(), weights=spectrum, minlength=bins)/count
+                self.G[start+i] = G
+                difference = spectrum - G[self.index.ravel()]
+                error += (difference**2).sum()
+                norm  += (spectrum**2).sum()
+                total += spectrum
+                totalError += difference
+        self.anisotropy = np.sqrt(error/norm) if norm else 0.0
+        norm = np.sqrt((total**2).sum())
+        self.kernelAnisotropy = np.sqrt((totalError**2).sum())/norm if norm else 0.0
+        self.droppedMass = self.dropped()
+        self.expanded = np.empty(self.index.shape, dtype=self.ftype) # a ring in Fourier space
+
+
+    def storage(self):
+        '''Return the bytes taken by the kernel rings.'''
+        return self.G.nbytes + self.index.nbytes
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        np.take(self.G[0], self.index, out=self.expanded)
+        L = self.expanded*self.U[self.head]
+        for j in xrange(1, self.nrings):
+            np.take(self.G[j], self.index, out=self.expanded)
+            L += self.expanded*self.U[(self.head+j) % self.nrings]
+        return self.synapticfactor*self.space(L)
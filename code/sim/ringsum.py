@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Accumulation kernels of the ring sum L = Σj Ki[j]·U[(head+j) % nrings].
+
+Two memory layouts of the kernel rings and of the circular history exist:
+
+    ring major   Ki and U of shape (nrings, ...), one spectrum per ring.
+                 The sum streams 2*nrings full spectra through memory and
+                 allocates a temporary for each product.
+    pixel major  Ki and U of shape (npixels, nrings), the rings of one
+                 frequency next to each other. The sum is a blocked
+                 reduction over the ring axis: tiles of pixels small
+                 enough to stay in the cache are reduced with matmul.
+
+parallelSum cuts the frequency plane of either layout into tiles summed by
+threads, which run at once as numpy releases the GIL in the products.
+'''
+
+import numpy as np
+
+cacheBytes = 1 << 22 # bytes of Ki and U in one tile of pixels
+
+
+def ringMajor(Ki, U, head, out=None, scratch=None):
+    """Return the ring sum of ring major kernel rings and history. Ring 0,
+    which reads the newest spectrum, is added last to the sum of the other
+    rings (see outerSum()), so that Engine.pipelinedSum gives the same sum
+    bit for bit. The loop of the original simulate() added ring 0 first,
+    which differs by rounding only.
+
+    :param Ki: kernel rings in Fourier space
+    :type  Ki: numpy array of shape (nrings, ...)
+    :param U: circular history of spectra, same shape as Ki
+    :type  U: complex numpy array
+    :param head: slot of U used by ring 0
+    :type  head: int
+    :param out: array to write the sum in, None for a new one
+    :type  out: complex numpy array
+    :param scratch: array of the products when out is given, None for a
+                    new one at each ring
+    :type  scratch: complex numpy array
+    :rtype: complex numpy array of shape Ki.shape[1:]
+
+    """
+
+    if len(Ki) == 1:
+        return np.multiply(Ki[0], U[head], out=out)
+    if out is None:
+        L = outerSum(Ki, U, head)
+        L += Ki[0] * U[head]
+        return L
+    outerSum(Ki, U, head, out=out, scratch=scratch)
+    out += np.multiply(Ki[0], U[head], out=scratch)
+    return out
+
+
+def outerSum(Ki, U, head, out=None, scratch=None):
+    """Return the ring sum of the rings 1..nrings-1 of ring major kernel
+    rings and history, at least 2 rings, to which ringMajor() and
+    Engine.pipelinedSum add ring 0.
+
+    :param Ki: kernel rings in Fourier space
+    :type  Ki: numpy array of shape (nrings, ...)
+    :param U: circular history of spectra, same shape as Ki
+    :type  U: complex numpy array
+    :param head: slot of U used by ring 0
+    :type  head: int
+    :param out: array to write the sum in, None for a new one
+    :type  out: complex numpy array
+    :param scratch: array of the products when out is given
+    :type  scratch: complex numpy array
+    :rtype: complex numpy array of shape Ki.shape[1:]
+
+    """
+
+    nrings = len(Ki)
+    if out is None:
+        L = Ki[1] * U[(head+1) % nrings]
+        for j in xrange(2, nrings):
+            L += Ki[j] * U[(head+j) % nrings]
+        return L
+    np.multiply(Ki[1], U[(head+1) % nrings], out=out)
+    for j in xrange(2, nrings):
+        out += np.multiply(Ki[j], U[(head+j) % nrings], out=scratch)
+    return out
+
+
+def tileSize(nrings):
+    '''Return the number of pixels of a tile for nrings rings.'''
+    return max(16, cacheBytes // (24*nrings)) # 8 bytes of Ki and 16 of U per ring
+
+
+def pixelMajor(Ki, U, head, out=None, tile=None, scratch=None):
+    """Return the ring sum of pixel major kernel rings and history.
+
+    The rings 0..nrings-1-head are the columns head..nrings-1 of U and the
+    rings nrings-head..nrings-1 wrap around to the columns 0..head-1, so
+    each tile is reduced with at most two matrix products.
+
+    :param Ki: kernel rings in Fourier space
+    :type  Ki: float64 numpy array of shape (npixels, nrings)
+    :param U: circular history of spectra
+    :type  U: complex128 numpy array of shape (npixels, nrings)
+    :param head: column of U used by ring 0
+    :type  head: int
+    :param out: array of npixels complex to write the sum in
+    :type  out: complex numpy array
+    :param tile: number of pixels reduced at once, None: see tileSize()
+    :type  tile: int
+    :param scratch: array of at least 2*tile reals of the dtype of Ki for
+                    the wrapped rings, None for a new one
+    :type  scratch: numpy array
+    :rtype: complex numpy array of npixels
+
+    """
+
+    npixels, nrings = Ki.shape
+    if out is None:
+        out = np.empty(npixels, dtype=U.dtype)
+    if tile is None:
+        tile = tileSize(nrings)
+    split = nrings - head
+
+    # complex numbers as pairs of reals: a real Ki row times U gives both parts
+    Ur   = U.view(Ki.dtype).reshape(npixels, nrings, 2)
+    Lr   = out.view(Ki.dtype).reshape(npixels, 1, 2)
+    if scratch is None:
+        scratch = np.empty(2*tile, dtype=Ki.dtype)
+    rest = scratch.reshape(-1)[:2*tile].reshape(tile, 1, 2)
+    for p in xrange(0, npixels, tile):
+        q = min(p+tile, npixels)
+        np.matmul(Ki[p:q,None,:split], Ur[p:q,head:], out=Lr[p:q])
+        if head:
+            np.matmul(Ki[p:q,None,split:], Ur[p:q,:head], out=rest[:q-p])
+            Lr[p:q] += rest[:q-p]
+    return out
+
+
+def parallelSum(Ki, U, head, pool, parts, layout='ring', tile=None):
+    """Return the ring sum with the frequency plane cut into parts tiles
+    summed by a pool of threads, bit for bit the sum of one thread.
+
+    :param Ki: kernel rings in Fourier space, ring or pixel major
+    :type  Ki: numpy array
+    :param U: circular history of spectra, in the layout of Ki
+    :type  U: complex numpy array
+    :param head: slot of U used by ring 0
+    :type  head: int
+    :param pool: threads summing the tiles
+    :type  pool: multiprocessing.pool.ThreadPool
+    :param parts: number of tiles
+    :type  parts: int
+    :param layout: 'ring' for tiles of rows of the spectra, 'pixel' for
+                   tiles of pixels
+    :type  layout: string
+    :param tile: number of pixels reduced at once in the pixel layout
+    :type  tile: int
+    :rtype: complex numpy array, of shape Ki.shape[1:] in the ring layout
+            and of npixels in the pixel layout
+
+    """
+
+    if layout == 'pixel':
+        out = np.empty(len(Ki), dtype=U.dtype)
+        size = len(Ki)
+        def part(first, stop):
+            pixelMajor(Ki[first:stop], U[first:stop], head, out=out[first:stop], tile=tile)
+    else:
+        out = np.empty(Ki.shape[1:], dtype=np.result_type(Ki.dtype, U.dtype))
+        size = Ki.shape[1]
+        def part(first, stop):
+            out[first:stop] = ringMajor(Ki[:,first:stop], U[:,first:stop], head)
+    bounds = np.linspace(0, size, min(parts, size)+1).astype(int)
+    pool.map(lambda i: part(bounds[i], bounds[i+1]), range(len(bounds)-1))
+    return out
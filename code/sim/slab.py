@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Kernel rings and history split over worker processes, for huge grids.
+
+At n = 4096, Ki and U do not fit in the memory of one process. SlabEngine
+starts worker processes that each keep the kernel rings and the history of
+a slab of columns of the spectra, and share with the main process six
+n x n arrays (multiprocessing.RawArray), in the dtypes of the precision of
+the engine, and the rings being transformed:
+
+    S      firing rate, written by the main process (dtype of Ki)
+    A      FFTs of the rows, the first half of a 2D FFT (dtype of U)
+    B      spectra transposed: B[c] is the column c of a spectrum (dtype of U)
+    L      synaptic input, written by the workers (dtype of Ki)
+    K, ring  the kernel (float64) and the ring of each pixel, for finite()
+    C      FFTs of the rows of a chunk of rings (complex128), for finite()
+
+A 2D FFT is split in two: each worker transforms its slab of rows into A,
+then the columns of its slab of A, which it keeps transposed in its own
+part of U. The ring sum is local to the slabs, and the inverse FFT goes
+the other way through B. The main process only updates V and sends the
+commands of each half through one pipe per worker, whose answers are the
+barriers between the halves.
+
+The kernel rings go the same way as S, a chunk of rings at a time (as
+many as fit in chunkBytes of sim.engine, at least one): each worker cuts
+the rings of the chunk from K in its slab of rows, with the pixels of its
+slab sorted by ring once, and transforms these rows into C; then it
+transforms the columns of its slab of C into its Ki. The work of the setup
+is thus split over the workers as the one of the steps, at the cost of the
+shared array C, of at least one spectrum in double precision.
+
+The results are those of Engine to rounding, 6e-16 of the largest |V| in
+double precision (the inverse FFT transforms the columns first); single
+precision rounds the halves of the 2D FFTs in A and B as well. Ki and U
+of each worker take 1/processes of the memory of Engine; the main process
+keeps V, I and the shared arrays. scaling() measures the time of a step
+for 1 to N processes. Measured on a machine of one core, the only one at
+hand, with the exponential kernel of values.py, c = 5 mm/s (182 rings),
+n = 256, where Engine takes 0.64 s to set up:
+
+    processes   setup (s)   seconds per step   speedup
+    1           0.79        0.0968             1.00
+    2           0.68        0.0945             1.02
+    4           0.67        0.0937             1.03
+
+On one core the processes only share it, so this shows that the barriers
+cost little, not how the engine scales: that needs a machine with several
+cores, and has not been measured.
+
+    from sim import Params
+    from sim.slab import SlabEngine
+    field = SlabEngine(Params.fromModule(values), processes=8)
+    field.advance(100)
+    field.close()
+'''
+
+import time
+import multiprocessing
+
+import numpy as np
+
+from sim.engine import Engine, chunkBytes
+from sim import ringsum, parallel
+
+
+def view(raw, dtype, n):
+    '''Return a shared array as an n x n numpy matrix.'''
+    return np.frombuffer(raw, dtype=dtype).reshape(n, n)
+
+
+def slabWorker(connection, shared, n, rows, columns, nrings, ftype, ctype, chunk):
+    """Run the commands of the main process on a slab, until 'stop'.
+
+    :param connection: end of the pipe of this worker
+    :type  connection: multiprocessing.connection.Connection
+    :param shared: the RawArrays S, A, B, L, K, ring and C
+    :type  shared: dictionary
+    :param n: size of the field
+    :type  n: int
+    :param rows: first and stop row of the slab of the field
+    :type  rows: tuple of ints
+    :param columns: first and stop column of the slab of the spectra
+    :type  columns: tuple of ints
+    :param nrings: number of rings
+    :type  nrings: int
+    :param ftype: dtype of Ki
+    :type  ftype: numpy dtype
+    :param ctype: dtype of U
+    :type  ctype: numpy dtype
+    :param chunk: number of rings in C
+    :type  chunk: int
+
+    """
+
+    S, L = [view(shared[name], ftype, n) for name in ('S', 'L')]
+    K = view(shared['K'], np.float64, n)
+    A, B = [view(shared[name], ctype, n) for name in ('A', 'B')]
+    C = np.frombuffer(shared['C'], dtype=np.complex128).reshape(chunk, n, n)
+    r0, r1 = rows
+    c0, c1 = columns
+    # pixels of the slab of rows sorted by ring: ring i is order[bounds[i]:bounds[i+1]]
+    ring   = view(shared['ring'], np.int32, n)[r0:r1].ravel()
+    order  = np.argsort(ring, kind='mergesort')
+    bounds = np.searchsorted(ring[order], np.arange(nrings+1))
+    Ki = np.zeros((nrings, c1-c0, n), dtype=ftype) # Ki[j][c] is the column c0+c of ring j
+    U  = np.empty((nrings, c1-c0, n), dtype=ctype)
+
+    while True:
+        name, args = connection.recv()
+        if name == 'stop':
+            break
+        try:
+            if name == 'kernel rows':      # first half of the FFTs of the rings first..last-1
+                first, last = args
+                pixel = order[bounds[first]:bounds[last]]
+                rings = np.zeros((last-first, (r1-r0)*n))
+                rings[ring[pixel]-first, pixel] = K[r0:r1].ravel()[pixel]
+                C[:last-first,r0:r1] = np.fft.fft(rings.reshape(last-first, r1-r0, n), axis=2)
+            elif name == 'kernel columns': # the columns of the slab of these rings
+                first, last = args
+                Ki[first:last] = np.fft.fft(C[:last-first,:,c0:c1], axis=1).real.transpose(0, 2, 1)
+            elif name == 'rows':           # first half of the FFT of S
+                A[r0:r1] = np.fft.fft(S[r0:r1], axis=1)
+            elif name == 'record':
+                slot, = args
+                U[slot] = np.fft.fft(A[:,c0:c1], axis=0).T
+            elif name == 'transpose':
+                B[c0:c1] = np.fft.fft(A[:,c0:c1], axis=0).T
+            elif name == 'history':
+                U[:] = B[c0:c1]
+            elif name == 'sum':            # ring sum and first half of its inverse FFT
+                head, = args
+                B[c0:c1] = np.fft.ifft(ringsum.ringMajor(Ki, U, head), axis=1)
+            elif name == 'inverse rows':
+                L[r0:r1] = np.fft.ifft(B[:,r0:r1].T, axis=1).real
+            else:
+                raise ValueError('unknown command of a slab: %r' % (name,))
+            connection.send(None)
+        except Exception as error:
+            connection.send(error)
+
+
+class SlabEngine(Engine):
+    """Engine keeping the kernel rings and the history in slabs of worker
+    processes."""
+
+    fixedOptions = {'layout': 'ring', 'realFFT': False, 'pipeline': False, 'workers': 1} # the processes sum the rings of their slabs
+
+    def __init__(self, p, processes=None, **options):
+        """Set up the field and start the worker processes, which set up the
+        slabs of the kernel rings and of the history.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param processes: number of worker processes, None for the number
+                          of cores
+        :type  processes: int
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.processes = multiprocessing.cpu_count() if processes is None else max(1, int(processes))
+        self.children = []
+        Engine.__init__(self, p, **options)
+
+
+    def start(self):
+        '''Share the arrays of the slabs and start the worker processes.'''
+
+        n = self.n
+        real = np.dtype(self.ftype).char            # 'f' or 'd'
+        part = np.finfo(self.ctype).dtype.char      # type of the real and imaginary parts of U
+        self.shared = {}
+        for name, code in (('S', real), ('L', real), ('K', 'd'), ('ring', 'i')):
+            self.shared[name] = multiprocessing.RawArray(code, n*n)
+        for name in ('A', 'B'):
+            self.shared[name] = multiprocessing.RawArray(part, 2*n*n)
+        self.chunk = max(1, min(self.nrings, chunkBytes // (16*n*n))) # rings in C
+        self.shared['C'] = multiprocessing.RawArray('d', 2*self.chunk*n*n)
+        self.S, self.L = [view(self.shared[name], self.ftype, n) for name in ('S', 'L')]
+        self.Kshared = view(self.shared['K'], np.float64, n)
+        self.B = view(self.shared['B'], self.ctype, n)
+        view(self.shared['ring'], np.int32, n)[:] = self.ringIndex()
+
+        self.connections = []
+        slabs = parallel.blocks(n, self.processes)
+        for rows in slabs:
+            here, there = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=slabWorker,
+                                             args=(there, self.shared, n, rows, rows, self.nrings, self.ftype, self.ctype, self.chunk))
+            worker.daemon = True
+            worker.start()
+            self.children.append(worker)
+            self.connections.append(here)
+
+
+    def command(self, name, *args):
+        """Send a command to every worker and wait for all of them.
+
+        :param name: the command, see slabWorker()
+        :type  name: string
+        :param args: its arguments
+
+        """
+
+        for connection in self.connections:
+            connection.send((name, args))
+        errors = [connection.recv() for connection in self.connections]
+        for error in errors:
+            if error is not None:
+                raise error
+
+
+    def finite(self):
+        '''Transform the kernel rings into the slabs of the workers, a chunk of rings at a time.'''
+
+        if not self.children:
+            self.start()
+        self.Kshared[:] = np.fft.ifftshift(self.K_)
+        for first in xrange(0, self.nrings, self.chunk):
+            last = min(first+self.chunk, self.nrings)
+            self.command('kernel rows', first, last)
+            self.command('kernel columns', first, last)
+        self.Ki = None # in the slabs of the workers
+        self.droppedMass = self.dropped()
+
+
+    def spectrum(self, S, out=None):
+        """Return the Fourier transform of a field, transformed by the
+        workers.
+
+        :param S: a field in the natural FFT order
+        :type  S: numpy 2D matrix
+        :param out: array to write the spectrum in, None for a new one
+        :type  out: numpy 2D matrix
+        :rtype: complex numpy 2D matrix
+
+        """
+
+        self.S[:] = S
+        self.command('rows')
+        self.command('transpose')
+        if out is None:
+            out = np.empty((self.n, self.n), dtype=self.ctype)
+        out[...] = self.B.T
+        return out
+
+
+    def history(self, U0):
+        """Initialize every slot of the slabs of the history to the
+        spectrum U0 of S(V0).
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        self.B[:] = U0.T
+        self.command('history')
+        self.U = None # in the slabs of the workers
+        self.head = 0
+
+
+    def ringSum(self):
+        """Return the synaptic input of the delayed rings in space, L,
+        summed and transformed by the workers.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        self.command('sum', self.head)
+        self.command('inverse rows')
+        return self.synapticfactor*self.L
+
+
+    def record(self, S):
+        """Add the spectrum of the firing rate S(V) to the slabs of the
+        history.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        self.head = (self.head-1) % self.nrings
+        self.S[:] = S
+        self.command('rows')
+        self.command('record', self.head)
+
+
+    def close(self):
+        '''Stop the worker processes.'''
+
+        Engine.close(self)
+        for connection in self.connections:
+            connection.send(('stop', ()))
+        for worker in self.children:
+            worker.join()
+        self.children = []
+        self.connections = []
+
+
+def scaling(p, processes=(1, 2, 4, 8), steps=20, **options):
+    """Return the seconds per step of SlabEngine for several numbers of
+    processes, and their speedup over the first one.
+
+    :param p: simulation parameters, or a module laid out as values.py
+    :type  p: sim.params.Params or module
+    :param processes: numbers of worker processes to time
+    :type  processes: sequence of ints
+    :param steps: number of iterations timed for each number of processes
+    :type  steps: int
+    :param options: other options of SlabEngine
+    :type  options: dictionary
+    :returns: number of processes: {'stepTime': seconds per step,
+              'speedup': stepTime of processes[0] over this stepTime}
+    :rtype: dictionary
+
+    """
+
+    times = {}
+    for count in processes:
+        field = SlabEngine(p, processes=count, **options)
+        try:
+            field.step()
+            st = time.time()
+            for i in xrange(steps):
+                field.step()
+            times[count] = (time.time() - st) / max(steps, 1)
+        finally:
+            field.close()
+    return dict((count, {'stepTime': times[count],
+                         'speedup' : times[processes[0]]/times[count]}) for count in processes)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Step functions of the engine, compiled at run time for each configuration.
+
+A step is written from the pieces below for one combination of noise or no
+noise, input or no input, first or second order (eta zero or nonzero) and the
+presence of updateI and updateK, so that no test of the configuration is left
+in the loop. The compiled function is kept in memory: engines sharing a
+configuration, later restarts and parameter sweeps reuse it.
+
+Engines made with inplace=True get the in place pieces, which update V and U
+through the arrays of engine.work with the operations of the expressions
+above in the same order, so that the results are the same bit for bit.
+'''
+
+import inspect
+
+import numpy as np
+
+# compiled step functions by configuration
+cache = {}
+
+head = '''def step(self):
+    # update the iteration
+    self.epoc += 1
+
+    # synaptic input of the delayed rings
+    L = self.ringSum()
+
+'''
+
+updateI = '''    # update I
+    I = self.updateI(round(self.epoc*self.dt, 12))
+    if I is not None:
+        self.I = self.natural(I)
+
+'''
+
+updateK = '''    # update K
+    K = self.updateK(round(self.epoc*self.dt, 12))
+    if K is not None:
+        self.K_ = self.kernel(K)
+        self.finite()
+
+'''
+
+# first order: keys are (noise, input)
+firstOrder = {
+    (False, True):  '    self.Vexcite += self.dt/self.gammafactor*(-self.Vexcite+L+self.I)\n\n',
+    (False, False): '    self.Vexcite += self.dt/self.gammafactor*(-self.Vexcite+L)\n\n',
+    (True,  True):  '    self.Vexcite += self.dt/self.gammafactor*(-self.Vexcite+L+self.I) +self.natural(self.random.normal(0,1.0,(self.n,self.n)))*self.noisy\n\n',
+    (True,  False): '    self.Vexcite += self.dt/self.gammafactor*(-self.Vexcite+L) +self.natural(self.random.normal(0,1.0,(self.n,self.n)))*self.noisy\n\n'}
+
+# second order: the V part is keyed by noise, the U part by input
+secondOrderV = {
+    False: '    self.Vexcite += self.dt*self.Uexcite\n',
+    True:  '    self.Vexcite += self.dt*self.Uexcite +self.natural(self.random.normal(0,1.0,(self.n,self.n)))*self.noisy\n'}
+secondOrderU = {
+    True:  '    self.Uexcite += (self.dt*(-self.gammafactor*self.Uexcite-self.Vexcite+L+self.I))/self.etafactor\n\n',
+    False: '    self.Uexcite += (self.dt*(-self.gammafactor*self.Uexcite-self.Vexcite+L))/self.etafactor\n\n'}
+
+tail = '''    # update U
+    self.record(self.updateS(self.Vexcite))
+'''
+
+# in place: the noise of the draws is added last, in float64 as above
+inplaceNoise = '''    N = self.noise(self.work['noise'])
+    N += W
+    self.Vexcite += N
+'''
+
+# first order in place: keys are (noise, input)
+inplaceFirstOrder = {
+    (False, True):  '''    W = self.work['W']
+    np.subtract(L, self.Vexcite, out=W)
+    W += self.I
+    W *= self.dt/self.gammafactor
+    self.Vexcite += W
+
+''',
+    (False, False): '''    W = self.work['W']
+    np.subtract(L, self.Vexcite, out=W)
+    W *= self.dt/self.gammafactor
+    self.Vexcite += W
+
+''',
+    (True,  True):  '''    W = self.work['W']
+    np.subtract(L, self.Vexcite, out=W)
+    W += self.I
+    W *= self.dt/self.gammafactor
+''' + inplaceNoise + '\n',
+    (True,  False): '''    W = self.work['W']
+    np.subtract(L, self.Vexcite, out=W)
+    W *= self.dt/self.gammafactor
+''' + inplaceNoise + '\n'}
+
+# second order in place: the V part is keyed by noise, the U part by input
+inplaceSecondOrderV = {
+    False: '''    W = self.work['W']
+    np.multiply(self.Uexcite, self.dt, out=W)
+    self.Vexcite += W
+''',
+    True:  '''    W = self.work['W']
+    np.multiply(self.Uexcite, self.dt, out=W)
+''' + inplaceNoise}
+inplaceSecondOrderU = {
+    True:  '''    np.multiply(self.Uexcite, -self.gammafactor, out=W)
+    W -= self.Vexcite
+    W += L
+    W += self.I
+    W *= self.dt
+    W /= self.etafactor
+    self.Uexcite += W
+
+''',
+    False: '''    np.multiply(self.Uexcite, -self.gammafactor, out=W)
+    W -= self.Vexcite
+    W += L
+    W *= self.dt
+    W /= self.etafactor
+    self.Uexcite += W
+
+'''}
+
+inplaceTail = '''    # update U
+    self.record(self.updateS(self.Vexcite, out=self.work['S']))
+'''
+
+
+def takesOut(function):
+    """Return whether a function of the user takes an argument out, the
+    array to write its result in.
+
+    :param function: updateS
+    :type  function: function
+    :rtype: boolean
+
+    """
+
+    try:
+        try:
+            return 'out' in inspect.signature(function).parameters
+        except AttributeError: # Python 2
+            return 'out' in inspect.getargspec(function).args
+    except (TypeError, ValueError): # builtins and ufuncs
+        return False
+
+
+def configuration(engine):
+    """Return the configuration of an engine that selects its step function.
+
+    :param engine: the simulation
+    :type  engine: sim.engine.Engine
+    :returns: (noise, input, second order, updateI, updateK, in place,
+              updateS in place)
+    :rtype: tuple of booleans
+
+    """
+
+    noise = engine.noisy is not None and not (np.isscalar(engine.noisy) and engine.noisy == 0.0)
+    externalI = engine.updateI is not None or not (np.isscalar(engine.I) and engine.I == 0.0)
+    inplace = getattr(engine, 'work', None) is not None
+    return (noise, externalI, engine.etafactor != 0.0, engine.updateI is not None, engine.updateK is not None,
+            inplace, inplace and takesOut(engine.updateS))
+
+
+def source(key):
+    """Return the source of the step function of a configuration.
+
+    :param key: configuration as returned by configuration()
+    :type  key: tuple of booleans
+    :rtype: string
+
+    """
+
+    noise, externalI, second, withI, withK, inplace, outS = key
+    text = head
+    if withI:
+        text += updateI
+    if withK:
+        text += updateK
+    if second and inplace:
+        text += '    # perform first and second order calculation in place\n'
+        text += inplaceSecondOrderV[noise] + inplaceSecondOrderU[externalI]
+    elif second:
+        text += '    # perform first and second order calculation\n'
+        text += secondOrderV[noise] + secondOrderU[externalI]
+    elif inplace:
+        text += '    # update V in place\n'
+        text += inplaceFirstOrder[(noise, externalI)]
+    else:
+        text += '    # update V\n'
+        text += firstOrder[(noise, externalI)]
+    return text + (inplaceTail if outS else tail)
+
+
+def stepFunction(engine):
+    """Return the step function specialized for the configuration of an
+    engine, compiling it the first time the configuration is seen.
+
+    :param engine: the simulation
+    :type  engine: sim.engine.Engine
+    :returns: a function of the engine that simulates one dt
+    :rtype: function
+
+    """
+
+    key = configuration(engine)
+    if key not in cache:
+        namespace = {'np': np}
+        exec(compile(source(key), '<step %s>' % (key,), 'exec'), namespace)
+        cache[key] = namespace['step']
+    return cache[key]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+FFTW plans of the transforms of the engine, with their wisdom on disk.
+
+The grid of a run never changes, and usually neither does the one of the
+next runs. With pyfftw installed, Engine(p, backend='fftw') (the default
+then) does its 2D transforms through FFTW plans made once per kind of
+transform, shape, dtype, number of threads and calling thread, and kept in
+plans for the engines that follow, up to maxPlans plans: the least recently
+used one is dropped first. Each plan owns aligned input and output arrays,
+which the transforms copy in and out.
+
+FFTW_MEASURE planning times several algorithms, which takes seconds at
+large n. The wisdom it gathers is written to wisdomFile after each new plan
+and read back before the first plan of a run, so that later runs get their
+tuned plans at once:
+
+    DNF_WISDOM=/scratch/dnf.wisdom python mainDNF.py
+
+The file holds the byte strings of pyfftw.export_wisdom(), each after its
+length on a line of its own; it is written to a temporary file renamed over
+the old one, so that engines writing at the same time do not truncate it.
+A file that cannot be read or imported only costs the planning time, with
+a warning.
+
+Without pyfftw, the engine uses numpy.fft (backend='numpy').
+'''
+
+import os
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+planner    = 'FFTW_MEASURE' # planning effort of new plans
+wisdomFile = os.environ.get('DNF_WISDOM', os.path.join(os.path.expanduser('~'), '.dnf_wisdom'))
+maxPlans   = 32 # plans kept, each with its arrays
+plans      = OrderedDict() # (kind, shape, dtype, threads, thread of the caller): plan, least recently used first
+plansLock  = threading.Lock() # plans and FFTW planning are shared by the threads of the pools
+wisdomRead = False
+
+
+def loadWisdom(path=None):
+    """Read FFTW wisdom from a file, if there is one. A file that cannot be
+    read or imported is left alone with a warning.
+
+    :param path: file of the wisdom, None for wisdomFile
+    :type  path: string
+    :returns: whether wisdom was read
+    :rtype: boolean
+
+    """
+
+    path = path or wisdomFile
+    if not os.path.exists(path):
+        return False
+    try:
+        wisdom = []
+        with open(path, 'rb') as f:
+            for line in iter(f.readline, b''):
+                size = int(line)
+                wisdom.append(f.read(size))
+                if len(wisdom[-1]) != size:
+                    raise ValueError('truncated wisdom')
+        pyfftw.import_wisdom(tuple(wisdom))
+        return True
+    except Exception as error:
+        warnings.warn('FFTW wisdom of %s not read: %s' % (path, error))
+        return False
+
+
+def saveWisdom(path=None):
+    """Write the FFTW wisdom of this process to a file, through a temporary
+    file renamed over it. A file that cannot be written only loses the
+    wisdom.
+
+    :param path: file of the wisdom, None for wisdomFile
+    :type  path: string
+
+    """
+
+    path = path or wisdomFile
+    try:
+        handle, temporary = tempfile.mkstemp(prefix='.dnf_wisdom', dir=os.path.dirname(os.path.abspath(path)))
+    except (IOError, OSError):
+        return
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            for wisdom in pyfftw.export_wisdom():
+                f.write(('%d\n' % len(wisdom)).encode('ascii'))
+                f.write(wisdom)
+        os.rename(temporary, path)
+    except (IOError, OSError):
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+
+def plan(kind, shape, dtype, threads):
+    """Return the plan of a transform over the last two axes, making it the
+    first time. The threads of a pool get plans of their own, as a plan
+    transforms in its own arrays; the plans are looked up, made and dropped
+    under plansLock.
+
+    :param kind: 'fft', 'rfft', 'ifft' or 'irfft'
+    :type  kind: string
+    :param shape: shape of the fields, (..., n, n)
+    :type  shape: tuple of ints
+    :param dtype: real dtype of the fields, float32 or float64
+    :type  dtype: numpy dtype
+    :param threads: threads of FFTW
+    :type  threads: int
+    :rtype: pyfftw.FFTW
+
+    """
+
+    global wisdomRead
+    dtype = np.dtype(dtype)
+    key = (kind, tuple(shape), dtype, threads, threading.current_thread().ident)
+    with plansLock:
+        if key in plans:
+            plans[key] = plans.pop(key) # most recently used
+            return plans[key]
+        if not wisdomRead:
+            wisdomRead = True
+            loadWisdom()
+        complexType = np.result_type(dtype, np.complex64)
+        half = tuple(shape[:-1])+(shape[-1]//2+1,)
+        if kind == 'fft':
+            a, b = pyfftw.empty_aligned(shape, complexType), pyfftw.empty_aligned(shape, complexType)
+        elif kind == 'ifft':
+            a, b = pyfftw.empty_aligned(shape, complexType), pyfftw.empty_aligned(shape, complexType)
+        elif kind == 'rfft':
+            a, b = pyfftw.empty_aligned(shape, dtype), pyfftw.empty_aligned(half, complexType)
+        else:
+            a, b = pyfftw.empty_aligned(half, complexType), pyfftw.empty_aligned(shape, dtype)
+        direction = 'FFTW_FORWARD' if kind in ('fft', 'rfft') else 'FFTW_BACKWARD'
+        plans[key] = pyfftw.FFTW(a, b, axes=(-2, -1), direction=direction, flags=(planner,), threads=threads)
+        while len(plans) > maxPlans:
+            plans.popitem(last=False)
+        saveWisdom()
+        return plans[key]
+
+
+def forward(S, real, threads, out=None):
+    """Return the 2D FFT of real fields over their last two axes.
+
+    :param S: real fields, float32 or float64
+    :type  S: numpy array of shape (..., n, n)
+    :param real: half spectrum of rfft2 instead of fft2
+    :type  real: boolean
+    :param threads: threads of FFTW
+    :type  threads: int
+    :param out: array to write the spectrum in, None for a new one
+    :type  out: complex numpy array
+    :rtype: complex numpy array
+
+    """
+
+    transform = plan('rfft' if real else 'fft', S.shape, S.dtype, threads)
+    transform.input_array[...] = S
+    transform.execute()
+    if out is None:
+        return transform.output_array.copy()
+    out[...] = transform.output_array
+    return out
+
+
+def inverse(L, real, n, threads, out=None):
+    """Return the real part of the inverse 2D FFT of spectra over their last
+    two axes.
+
+    :param L: spectra, complex64 or complex128
+    :type  L: complex numpy array
+    :param real: L holds half spectra of rfft2
+    :type  real: boolean
+    :param n: columns of the fields
+    :type  n: int
+    :param threads: threads of FFTW
+    :type  threads: int
+    :param out: array to write the fields in, None for a new one
+    :type  out: numpy array
+    :rtype: numpy array
+
+    """
+
+    dtype = np.finfo(L.dtype).dtype # real dtype of the spectra
+    shape = tuple(L.shape[:-1])+(n,)
+    transform = plan('irfft' if real else 'ifft', shape, dtype, threads)
+    transform.input_array[...] = L
+    transform.execute()
+    result = transform.output_array
+    result *= 1.0/(shape[-2]*shape[-1]) # execute() does not normalize
+    if not real:
+        result = result.real
+    if out is None:
+        return result.copy()
+    out[...] = result
+    return out
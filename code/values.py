@@ -88,8 +88,15 @@ K = -4*np.exp(-x/3) / (18*np.pi)
 
 '''This is the firing rate, S. 
 You can delete/add/change variables but you must keep the function name S and return the firing rate.'''
-def updateS(V): # V is the passed in field voltage
+def updateS(V, out=None): # V is the passed in field voltage, out an array to write S in (optional)
     S0    = 1.0 # S: maximum frequency
     alpha = 10000.0 # α: steepness at the threshold 
     theta = 0.005 # θ: firing threshold
-    return S0 / (1.0 + np.exp(-1*alpha*(V-theta)))
+    if out is None:
+        return S0 / (1.0 + np.exp(-1*alpha*(V-theta)))
+    # the same operations, written in out by an engine made with inplace=True
+    np.subtract(V, theta, out=out)
+    out *= -1*alpha
+    np.exp(out, out=out)
+    out += 1.0
+    return np.divide(S0, out, out=out)